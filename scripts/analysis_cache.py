@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 分析结果缓存 - 内容寻址
+
+设计说明：
+- 键 = 模型名 + 提示词模板版本 + 生成参数 + （标题, 截断后正文）的哈希
+- 值 = 解析后的分析结果 JSON；任何一项变化都会自然失效
+- 失败重跑、调整标签规则后重跑时，已分析过的文章不再调用模型
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+from disk_cache import DiskCache
+
+
+class AnalysisCache:
+    """分析结果缓存"""
+
+    def __init__(self, path: str, max_bytes: int, prompt_version: str, generation_params: Dict):
+        """
+        Args:
+            path: 缓存数据库路径
+            max_bytes: 容量上限（字节）
+            prompt_version: 提示词模板版本，修改模板时需要递增
+            generation_params: 影响输出的生成参数（temperature / top_p / top_k / max_tokens）
+        """
+        self.cache = DiskCache(path, max_bytes=max_bytes)
+        self.prompt_version = prompt_version
+        self.generation_params = dict(generation_params)
+
+    def make_key(self, model: str, title: str, content: str) -> str:
+        content_hash = hashlib.sha256(f"{title}\n{content}".encode('utf-8')).hexdigest()
+        key_material = json.dumps({
+            'model': model,
+            'prompt_version': self.prompt_version,
+            'params': self.generation_params,
+            'content': content_hash,
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def get(self, model: str, title: str, content: str) -> Optional[Dict]:
+        value = self.cache.get(self.make_key(model, title, content))
+        if value is None:
+            return None
+        try:
+            return json.loads(value.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+
+    def set(self, model: str, title: str, content: str, analysis_data: Dict):
+        value = json.dumps(analysis_data, ensure_ascii=False).encode('utf-8')
+        self.cache.set(self.make_key(model, title, content), value)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+    def close(self):
+        self.cache.close()
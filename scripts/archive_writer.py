@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片归档 - 定长分片 + 清单，保留全部历史
+
+设计说明：
+- 全部条目按 ID 顺序存入定长分片 archive/shard-000001.json、shard-000002.json ...（每片 shard_size 条）
+- archive/manifest.json 列出每个分片的条目数、ID 范围、日期范围、字节数与 sha256
+- 新条目只会写入最新分片（写满后开新分片），旧分片永不改写，前端与 git 都只需关注变化的文件
+- 未写满的分片带条目数后缀（shard-000003-42.json），追加时写成新文件而不是原地改写；
+  写满后改用固定名 shard-000003.json。清单引用的文件因此永远不会被覆盖
+- 先写分片再写清单：清单是提交点，提交后才删除被取代的旧文件；崩溃后清单仍指向校验过的旧分片，
+  遗留的未提交文件在下次追加时清理
+- data.json 继续只保留最近 100 条，兼容旧版前端
+"""
+
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from output_writer import atomic_write, validate_records
+
+MANIFEST_VERSION = 1
+
+
+class ShardedArchive:
+    """定长分片归档"""
+
+    def __init__(self, directory: str, shard_size: int = 100):
+        """
+        Args:
+            directory: 归档目录（与 data.json 一起发布）
+            shard_size: 每个分片的条目数；已有清单时以清单中的值为准
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = self._load_manifest()
+        self.shard_size = self.manifest.get('shard_size') or shard_size
+        self.manifest['shard_size'] = self.shard_size
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict) and isinstance(manifest.get('shards'), list):
+                return manifest
+            print(f"Warning: {self.manifest_path} has an unexpected layout, starting a new archive.")
+        except FileNotFoundError:
+            pass
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"Warning: failed to read {self.manifest_path} ({e}), starting a new archive.")
+        return {'version': MANIFEST_VERSION, 'shards': []}
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.manifest['shards'])
+
+    @property
+    def total(self) -> int:
+        return sum(shard['count'] for shard in self.manifest['shards'])
+
+    def next_id(self) -> int:
+        """归档中最大 ID + 1（data.json 被重置时仍保证 ID 不回退）"""
+        shards = self.manifest['shards']
+        return shards[-1]['last_id'] + 1 if shards else 1
+
+    def _read_shard(self, shard: Dict) -> List[Dict]:
+        path = os.path.join(self.directory, shard['file'])
+        with open(path, 'rb') as f:
+            payload = f.read()
+        if hashlib.sha256(payload).hexdigest() != shard['sha256']:
+            raise ValueError(f"{path} does not match the manifest hash")
+        return json.loads(payload.decode('utf-8'))
+
+    def append(self, new_items: List[Dict]) -> List[str]:
+        """
+        追加条目：只改写最新分片（以及新开的分片）和清单
+
+        Returns:
+            List[str]: 本次写入的分片文件名
+        """
+        last_id = self.next_id() - 1
+        new_items = [item for item in new_items if item['id'] > last_id]
+        if not new_items:
+            return []
+
+        shards = self.manifest['shards']
+        pending = list(new_items)
+        open_items: List[Dict] = []
+        superseded = None
+        if shards and shards[-1]['count'] < self.shard_size:
+            open_items = self._read_shard(shards[-1])
+            superseded = shards.pop()['file']
+
+        written = []
+        while pending or open_items:
+            room = self.shard_size - len(open_items)
+            items = open_items + pending[:room]
+            pending = pending[room:]
+            open_items = []
+            shard = self._write_shard(len(shards) + 1, items, avoid=superseded)
+            shards.append(shard)
+            written.append(shard['file'])
+
+        self.manifest.update({
+            'version': MANIFEST_VERSION,
+            'total': self.total,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        })
+        payload = json.dumps(self.manifest, indent=2, ensure_ascii=False).encode('utf-8')
+        atomic_write(self.manifest_path, payload)
+        self._remove_unreferenced(written)
+        return written
+
+    def shard_name(self, number: int, count: int, avoid: Optional[str] = None) -> str:
+        """写满的分片用固定名；未写满的分片名带条目数，每次追加都是新文件（avoid：清单仍引用的文件名）"""
+        name = f"shard-{number:06d}.json"
+        if count >= self.shard_size and name != avoid:
+            return name
+        return f"shard-{number:06d}-{count}.json"
+
+    def _remove_unreferenced(self, written: List[str]):
+        """清单提交后删除同编号下被取代的分片和崩溃遗留的未提交文件"""
+        referenced = {shard['file'] for shard in self.manifest['shards']}
+        for name in written:
+            number = name[len('shard-'):len('shard-') + 6]
+            for path in glob.glob(os.path.join(self.directory, f"shard-{number}*.json")):
+                if os.path.basename(path) not in referenced:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"Warning: failed to remove superseded shard {path}: {e}")
+
+    def _write_shard(self, number: int, items: List[Dict], avoid: Optional[str] = None) -> Dict:
+        name = self.shard_name(number, len(items), avoid)
+        payload = json.dumps(items, indent=2, ensure_ascii=False).encode('utf-8')
+        validate_records(payload, len(items))
+        atomic_write(os.path.join(self.directory, name), payload)
+        dates = sorted(item['date'] for item in items if item.get('date'))
+        return {
+            'file': name,
+            'count': len(items),
+            'first_id': items[0]['id'],
+            'last_id': items[-1]['id'],
+            'date_from': dates[0] if dates else None,
+            'date_to': dates[-1] if dates else None,
+            'bytes': len(payload),
+            'sha256': hashlib.sha256(payload).hexdigest(),
+        }
+
+    def newest(self) -> Optional[Dict]:
+        shards = self.manifest['shards']
+        return shards[-1] if shards else None
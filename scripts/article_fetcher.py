@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章下载器 - 流式读取、字节上限与内容类型预检
+
+设计说明：
+- 正文超过 token 预算的部分最终会被截断，没必要把几 MB 的页面整个读进内存
+- 流式读取响应体，累计达到字节上限即停止（截断的 HTML 交给解析器容错）
+- 读取响应体之前先看 Content-Type：PDF、图片、音视频等非 HTML 内容直接放弃
+- 字符集只在原始字节上判定一次：响应头 charset → BOM → <meta> 声明 → UTF-8 试解码 → 统计检测
+- 每次下载记录实际传输字节数（压缩后）与解码后字节数，便于统计节省的带宽
+"""
+
+import codecs
+import re
+import threading
+from typing import Dict, List, Optional
+
+from http_client import HttpClient
+
+try:
+    import charset_normalizer  # installed with requests
+except ImportError:
+    charset_normalizer = None
+
+CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+META_SNIFF_BYTES = 4096  # <meta charset> 只在文档开头查找
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class UnsupportedContentError(Exception):
+    """响应的 Content-Type 不是 HTML"""
+
+
+def _header_charset(content_type: str) -> Optional[str]:
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(body: bytes, content_type: str = '') -> str:
+    """
+    在原始字节上判定一次字符集
+
+    Args:
+        body: 响应体（可能已截断）
+        content_type: Content-Type 响应头
+    """
+    encoding = _valid_codec(_header_charset(content_type))
+    if encoding:
+        return encoding
+    for bom, name in BOMS:
+        if body.startswith(bom):
+            return name
+    match = META_CHARSET_RE.search(body[:META_SNIFF_BYTES])
+    if match:
+        encoding = _valid_codec(match.group(1).decode('ascii', 'ignore'))
+        if encoding:
+            return encoding
+    try:
+        # A byte cap may cut a multi-byte character: tolerate an incomplete tail
+        codecs.getincrementaldecoder('utf-8')().decode(body, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if charset_normalizer is not None:
+        best = charset_normalizer.from_bytes(body[:256 * 1024]).best()
+        if best is not None and _valid_codec(best.encoding):
+            return best.encoding
+    return 'latin-1'
+
+
+class ArticleFetcher:
+    """带字节上限的文章下载器（线程安全，预取线程共享一个实例）"""
+
+    def __init__(self, http_client: HttpClient, max_bytes: int = 2 * 1024 * 1024):
+        """
+        Args:
+            http_client: 共享的 HTTP 客户端
+            max_bytes: 单个页面最多读取的字节数（解码后），<= 0 表示不限制
+        """
+        self.http_client = http_client
+        self.max_bytes = max_bytes
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> str:
+        """
+        下载页面并返回解码后的 HTML
+
+        Raises:
+            UnsupportedContentError: Content-Type 不是 HTML
+            requests.RequestException: 网络错误或非 2xx 状态码
+        """
+        with self.http_client.get(url, stream=True) as resp:
+            resp.raise_for_status()
+            content_type = resp.headers.get('Content-Type', '')
+            media_type = content_type.split(';')[0].strip().lower()
+            # A missing Content-Type is tolerated: the parser will decide
+            if media_type and media_type not in HTML_CONTENT_TYPES:
+                self._record(url, 0, 0, False, media_type)
+                raise UnsupportedContentError(f"unsupported content type {media_type}")
+
+            chunks = []
+            size = 0
+            truncated = False
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if 0 < self.max_bytes <= size:
+                    truncated = True
+                    break
+            body = b''.join(chunks)
+            if truncated:
+                body = body[:self.max_bytes]
+            wire_bytes = self._wire_bytes(resp, size)
+
+        encoding = detect_encoding(body, content_type)
+        self._record(url, wire_bytes, len(body), truncated, media_type)
+        return body.decode(encoding, errors='replace')
+
+    @staticmethod
+    def _wire_bytes(resp, decoded_size: int) -> int:
+        """实际从网络读取的字节数（gzip/br 压缩前）；取不到时用解码后的大小"""
+        tell = getattr(resp.raw, 'tell', None)
+        try:
+            return int(tell()) if tell else decoded_size
+        except Exception:
+            return decoded_size
+
+    def _record(self, url: str, wire_bytes: int, body_bytes: int, truncated: bool, media_type: str):
+        with self._lock:
+            self.records.append({
+                'url': url,
+                'bytes': wire_bytes,
+                'body_bytes': body_bytes,
+                'truncated': truncated,
+                'content_type': media_type,
+                'rejected': bool(media_type) and media_type not in HTML_CONTENT_TYPES,
+            })
+
+    def last_record(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            for record in reversed(self.records):
+                if record['url'] == url:
+                    return record
+        return None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'fetched': sum(1 for r in self.records if not r['rejected']),
+                'rejected': sum(1 for r in self.records if r['rejected']),
+                'truncated': sum(1 for r in self.records if r['truncated']),
+                'bytes': sum(r['bytes'] for r in self.records),
+            }
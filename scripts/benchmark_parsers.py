@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML 解析器后端基准 - 在保存的页面语料上比较各后端的解析与抽取耗时
+
+用法：
+    python scripts/benchmark_parsers.py [语料目录 ...] [--repeat N]
+
+- 默认语料为 scripts/fixtures/extraction/ 下的 .html 文件，可追加保存的真实页面目录
+- 每个已安装的后端分别测量：原始解析、剔除 script/style 后解析、完整抽取（选择器 + 兜底）
+- 以 html.parser 的抽取结果为基准，报告各后端输出不一致的页面
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from content_extractor import CONTENT_SELECTORS, available_parsers, extract_article_text, strip_script_style
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'extraction')
+BASELINE_PARSER = 'html.parser'
+
+
+def load_corpus(directories):
+    pages = []
+    for directory in directories:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.html', '.htm')):
+                with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                    pages.append((name, f.read()))
+    return pages
+
+
+def timed(fn, repeat):
+    """返回 (最后一次结果, 中位耗时秒)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BeautifulSoup parser backends for article extraction')
+    parser.add_argument('corpus', nargs='*', default=[FIXTURE_DIR], help='directories of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per page (median is reported)')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print('No .html pages found in corpus.')
+        return 1
+    backends = available_parsers()
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in pages)
+    print(f"Corpus: {len(pages)} pages, {total_bytes / 1024:.1f} KB; backends: {', '.join(backends)}\n")
+
+    baseline = {name: extract_article_text(html, CONTENT_SELECTORS, BASELINE_PARSER) for name, html in pages}
+
+    print(f"{'backend':<14}{'parse ms':>12}{'stripped ms':>14}{'extract ms':>13}{'MB/s':>9}{'same output':>14}")
+    for backend in backends:
+        parse_total = stripped_total = extract_total = 0.0
+        mismatches = []
+        for name, html in pages:
+            _, parse_time = timed(lambda: BeautifulSoup(html, backend), args.repeat)
+            _, stripped_time = timed(lambda: BeautifulSoup(strip_script_style(html), backend), args.repeat)
+            text, extract_time = timed(lambda: extract_article_text(html, CONTENT_SELECTORS, backend), args.repeat)
+            parse_total += parse_time
+            stripped_total += stripped_time
+            extract_total += extract_time
+            if text != baseline[name]:
+                mismatches.append(name)
+        throughput = total_bytes / extract_total / (1024 * 1024) if extract_total else 0.0
+        same = f"{len(pages) - len(mismatches)}/{len(pages)}"
+        print(f"{backend:<14}{parse_total * 1000:>12.2f}{stripped_total * 1000:>14.2f}"
+              f"{extract_total * 1000:>13.2f}{throughput:>9.2f}{same:>14}")
+        for name in mismatches:
+            print(f"    differs from {BASELINE_PARSER}: {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端离线基准 - 本地订阅源、文章页面与模型接口替身
+
+用法：
+    python scripts/benchmark_pipeline.py [--scales 10,100,1000] [--per-source 10]
+                                         [--llm-latency 0.05] [--llm-error-rate 0.02]
+                                         [--pages 目录] [--stream] [--json 报告.json]
+
+设计说明：
+- 进程内启动一个 HTTP 服务：/feed/<i> 返回 RSS，/article/<i>/<j> 返回文章页面，
+  /v1/chat/completions 模拟 OpenRouter（可配置延迟、抖动与出错率，请求带 stream 时以 SSE 分块返回），全程不访问外网
+- 文章正文由固定种子生成，每篇内容不同（不会被近似重复检测拦下），结果可复现；
+  --pages 可改用保存的真实页面（循环使用，此时关闭近似重复检测）
+- 每个规模在独立临时目录中以子进程运行 rss_analyzer.py，冷启动（无缓存、无历史链接）
+- 报告吞吐（条/秒）、各阶段耗时百分位（来自运行报告 run_report.json）与分析进程的峰值内存
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYZER = os.path.join(SCRIPT_DIR, 'rss_analyzer.py')
+STREAM_CHUNK_CHARS = 40  # Content per streamed event
+STAGES = ['collect', 'feed', 'extract', 'fetch', 'parse', 'clean', 'analyze', 'tag', 'write']
+VOCABULARY = (
+    "model data startup funding research agent latency cache market policy chip open source team product "
+    "user growth paper benchmark cloud inference training dataset robot vision speech compiler kernel "
+    "network storage database security privacy browser mobile design pricing revenue hiring launch "
+    "release update feature customer platform developer community license regulation energy battery"
+).split()
+ANALYSIS = {
+    "title_zh": "基准测试文章",
+    "summary_en": "A synthetic article served by the offline benchmark.",
+    "summary_zh": "离线基准生成的文章。",
+    "best_quote_en": "Measure before optimizing.",
+    "best_quote_zh": "先测量，再优化。",
+    "tags": ["ai-research", "benchmark"],
+    "tags_zh": ["AI研究", "基准测试"],
+}
+
+
+def generate_article(source: int, index: int, paragraphs: int) -> str:
+    rnd = random.Random(source * 100003 + index)
+    body = ''.join(
+        '<p>' + ' '.join(rnd.choice(VOCABULARY) for _ in range(rnd.randint(40, 80))) + '.</p>'
+        for _ in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Post {source}-{index}</title><script>var tracking = true;</script></head>"
+        f"<body><nav>Home | About | Subscribe</nav><article><h1>Post {source}-{index}</h1>{body}</article>"
+        f"<footer>Copyright benchmark</footer></body></html>"
+    )
+
+
+class StandInServer:
+    """订阅源、文章与模型接口替身（ThreadingHTTPServer，后台线程运行）"""
+
+    def __init__(self, per_source: int, paragraphs: int = 12, pages=None,
+                 llm_latency: float = 0.05, llm_jitter: float = 0.5, llm_error_rate: float = 0.0, seed: int = 0):
+        self.per_source = per_source
+        self.paragraphs = paragraphs
+        self.pages = pages or []
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.llm_error_rate = llm_error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = {'feed': 0, 'article': 0, 'llm': 0, 'llm_errors': 0}
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.requests[key] += 1
+
+    def _draw(self):
+        """(延迟秒, 错误类型或 None)"""
+        with self._lock:
+            jitter = 1 + self._random.uniform(-self.llm_jitter, self.llm_jitter)
+            failed = self._random.random() < self.llm_error_rate
+            kind = self._random.choice(['http_500', 'http_429', 'bad_json']) if failed else None
+        return max(0.0, self.llm_latency * jitter), kind
+
+    def feed(self, source: int) -> bytes:
+        now = time.time()
+        items = ''.join(
+            f"<item><title>Post {source}-{j}</title>"
+            f"<link>{self.base_url}/article/{source}/{j}</link>"
+            f"<pubDate>{formatdate(now - j * 3600, usegmt=True)}</pubDate>"
+            f"<description>Summary of post {source}-{j}</description></item>"
+            for j in range(self.per_source)
+        )
+        return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f'<title>Source {source}</title><link>{self.base_url}/</link>{items}</channel></rss>').encode('utf-8')
+
+    def article(self, source: int, index: int) -> bytes:
+        if self.pages:
+            return self.pages[(source * self.per_source + index) % len(self.pages)].encode('utf-8')
+        return generate_article(source, index, self.paragraphs).encode('utf-8')
+
+    def completion(self):
+        latency, error = self._draw()
+        time.sleep(latency)
+        if error == 'http_500':
+            return 500, json.dumps({"error": {"message": "stand-in server error"}}).encode('utf-8')
+        if error == 'http_429':
+            return 429, json.dumps({"error": {"message": "stand-in rate limit"}}).encode('utf-8')
+        content = json.dumps(ANALYSIS, ensure_ascii=False)
+        if error == 'bad_json':
+            content = content[:len(content) // 2]
+        body = {"choices": [{"message": {"content": content}}],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 200}}
+        return 200, json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                try:
+                    if parts[0] == 'feed' and len(parts) == 2:
+                        server._count('feed')
+                        return self._send(200, server.feed(int(parts[1])), 'application/rss+xml; charset=utf-8')
+                    if parts[0] == 'article' and len(parts) == 3:
+                        server._count('article')
+                        return self._send(200, server.article(int(parts[1]), int(parts[2])),
+                                          'text/html; charset=utf-8')
+                except ValueError:
+                    pass
+                self._send(404, b'not found', 'text/plain')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                server._count('llm')
+                status, body = server.completion()
+                if status != 200:
+                    server._count('llm_errors')
+                if status == 200 and request.get('stream'):
+                    return self._send_stream(json.loads(body)['choices'][0]['message']['content'])
+                self._send(status, body, 'application/json')
+
+            def _send_stream(self, content):
+                # Server-sent events without a length: the connection closes after [DONE]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+                for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                    event = {"choices": [{"delta": {"content": content[start:start + STREAM_CHUNK_CHARS]}}]}
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def load_pages(directory: str):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+
+def run_scale(server: StandInServer, candidates: int, args) -> dict:
+    """在临时目录中冷启动运行一次分析流程"""
+    sources = math.ceil(candidates / server.per_source)
+    with tempfile.TemporaryDirectory(prefix='rss-bench-') as workdir:
+        os.makedirs(os.path.join(workdir, 'scripts'))
+        with open(os.path.join(workdir, 'scripts', 'source.json'), 'w', encoding='utf-8') as f:
+            json.dump([{'name': f'Source {i}', 'url': f'{server.base_url}/feed/{i}'} for i in range(sources)], f)
+        metrics_path = os.path.join(workdir, 'run_report.json')
+        env = dict(os.environ)
+        env.update({
+            'OPENROUTER_API_KEY': 'sk-or-v1-offline-benchmark',
+            'OPENROUTER_URL': f'{server.base_url}/v1/chat/completions',
+            'OPENROUTER_RPM': '0',
+            'OPENROUTER_TPM': '0',
+            'OPENROUTER_MAX_CONCURRENCY': str(args.concurrency),
+            'OPENROUTER_STREAM': '1' if args.stream else '0',
+            'MAX_NEW_ITEMS': str(candidates),
+            'MAX_API_CALLS': str(candidates * 2),
+            'MAX_PER_SOURCE': str(server.per_source),
+            'FEED_DEADLINE': '3600',
+            'CACHE_DIR': os.path.join(workdir, '.cache'),
+            'ANALYSIS_CACHE': '0',
+            'NEAR_DUP': '0' if server.pages else env.get('NEAR_DUP', '1'),
+            'RUN_REPORT_FILE': metrics_path,
+            'NO_PROXY': '127.0.0.1,localhost',
+        })
+        log_path = os.path.join(workdir, 'run.log')
+        started = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            proc = subprocess.run([sys.executable, ANALYZER], cwd=workdir, env=env,
+                                  stdout=log, stderr=subprocess.STDOUT)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0 or not os.path.exists(metrics_path):
+            with open(log_path, 'r', encoding='utf-8') as f:
+                tail = f.read()[-2000:]
+            raise RuntimeError(f"rss_analyzer.py exited with {proc.returncode} at {candidates} candidates:\n{tail}")
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+    metrics['requested'] = candidates
+    metrics['source_count'] = sources
+    metrics['process_wall_s'] = wall
+    metrics['items_per_s'] = metrics['items'] / wall if wall else 0.0
+    return metrics
+
+
+def print_report(results):
+    print(f"\n{'candidates':>10} {'sources':>8} {'items':>7} {'calls':>7} {'wall s':>8} {'items/s':>8} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['candidates']:>10} {r['source_count']:>8} {r['items']:>7} {r['api_calls']:>7} "
+              f"{r['process_wall_s']:>8.2f} {r['items_per_s']:>8.1f} {r['peak_rss_mb']:>8.1f}")
+    print(f"\n{'candidates':>10} {'stage':>8} {'count':>7} {'total s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for r in results:
+        for stage in STAGES:
+            s = r['stages'].get(stage)
+            if s:
+                print(f"{r['candidates']:>10} {stage:>8} {s['count']:>7} {s['total_s']:>8.2f} {s['p50_ms']:>8.1f} "
+                      f"{s['p90_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark of the RSS analysis pipeline')
+    parser.add_argument('--scales', default='10,100,1000',
+                        help='comma-separated candidate counts (10 to 10000)')
+    parser.add_argument('--per-source', type=int, default=10, help='items per feed (MAX_PER_SOURCE)')
+    parser.add_argument('--paragraphs', type=int, default=12, help='paragraphs per generated article')
+    parser.add_argument('--pages', help='directory of saved .html pages to serve instead of generated articles')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='mean stand-in model latency (seconds)')
+    parser.add_argument('--llm-jitter', type=float, default=0.5, help='latency jitter as a fraction of the mean')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0,
+                        help='fraction of model calls answered with 500/429/truncated JSON')
+    parser.add_argument('--concurrency', type=int, default=8, help='OPENROUTER_MAX_CONCURRENCY for the runs')
+    parser.add_argument('--stream', action='store_true', help='run with OPENROUTER_STREAM=1 (SSE replies)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for latency and error draws')
+    parser.add_argument('--json', help='also write the full results to this file')
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    pages = load_pages(args.pages) if args.pages else None
+    if args.pages and not pages:
+        print(f'No .html pages found in {args.pages}.')
+        return 1
+
+    server = StandInServer(args.per_source, paragraphs=args.paragraphs, pages=pages,
+                           llm_latency=args.llm_latency, llm_jitter=args.llm_jitter,
+                           llm_error_rate=args.llm_error_rate, seed=args.seed).start()
+    print(f"Stand-in server at {server.base_url} (model latency {args.llm_latency * 1000:.0f} ms "
+          f"±{args.llm_jitter:.0%}, error rate {args.llm_error_rate:.0%})")
+    results = []
+    try:
+        for candidates in scales:
+            print(f"Running {candidates} candidates...", flush=True)
+            results.append(run_scale(server, candidates, args))
+    finally:
+        server.stop()
+
+    print_report(results)
+    print(f"\nStand-in requests: {server.requests}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文抽取对比 - 旧的"最长容器"兜底策略 vs 文本密度抽取器
+
+用法：
+    python scripts/compare_extractors.py
+
+- 对 scripts/fixtures/extraction/ 下的每个页面运行两种兜底策略（不经过 CONTENT_SELECTORS 快速路径）
+- 按 expected.json 检查必须包含/不得包含的句子
+- 另外生成一个深层嵌套页面比较耗时
+- 新抽取器在任何页面上比旧策略差时返回非零退出码
+"""
+
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from content_extractor import find_main_container
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'extraction')
+
+
+def legacy_find_main_container(soup):
+    """旧兜底策略：从 article/div/section/main 中选文本最长的容器（逐个复制子树）"""
+    fallback_candidates = []
+    for tag_name in ['article', 'div', 'section', 'main']:
+        elements = soup.find_all(tag_name)
+        for element in elements:
+            # 移除导航、页脚、侧边栏等噪音元素
+            temp_element = element.__copy__()
+            for noise_tag in temp_element.find_all(['nav', 'footer', 'header', 'aside', 'script', 'style']):
+                noise_tag.decompose()
+
+            text_content = temp_element.get_text(separator='\n', strip=True)
+            if text_content:
+                fallback_candidates.append((element, len(text_content)))
+
+    if fallback_candidates:
+        return max(fallback_candidates, key=lambda x: x[1])[0]
+    return None
+
+
+def run_extractor(extractor, html):
+    soup = BeautifulSoup(html, 'html.parser')
+    started = time.perf_counter()
+    node = extractor(soup)
+    elapsed = time.perf_counter() - started
+    text = node.get_text(separator='\n', strip=True) if node else ''
+    return text, elapsed
+
+
+def check(text, expectation):
+    """返回 (得分, 满分)：每条必须包含/不得包含的句子各计 1 分"""
+    score = sum(1 for s in expectation.get('must_contain', []) if s in text)
+    score += sum(1 for s in expectation.get('must_not_contain', []) if s not in text)
+    total = len(expectation.get('must_contain', [])) + len(expectation.get('must_not_contain', []))
+    return score, total
+
+
+def nested_page(depth=12, fanout=3, paragraphs=4):
+    """生成深层嵌套页面，用于比较两种策略的耗时"""
+    para = '<p>' + 'This sentence pads the paragraph with realistic prose, commas, and words. ' * 4 + '</p>'
+
+    def build(level):
+        if level == depth:
+            return para * paragraphs
+        return ''.join(f'<div class="l{level}">{build(level + 1)}</div>' for _ in range(fanout if level % 4 == 0 else 1))
+
+    return f'<html><body>{build(0)}</body></html>'
+
+
+def main():
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+
+    regressions = 0
+    print(f"{'fixture':<26}{'legacy':>10}{'density':>10}{'legacy ms':>12}{'density ms':>12}")
+    for name, expectation in sorted(expected.items()):
+        with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+            html = f.read()
+        legacy_text, legacy_time = run_extractor(legacy_find_main_container, html)
+        density_text, density_time = run_extractor(find_main_container, html)
+        legacy_score, total = check(legacy_text, expectation)
+        density_score, _ = check(density_text, expectation)
+        if density_score < legacy_score:
+            regressions += 1
+        print(f"{name:<26}{f'{legacy_score}/{total}':>10}{f'{density_score}/{total}':>10}"
+              f"{legacy_time * 1000:>12.2f}{density_time * 1000:>12.2f}")
+
+    html = nested_page()
+    legacy_text, legacy_time = run_extractor(legacy_find_main_container, html)
+    density_text, density_time = run_extractor(find_main_container, html)
+    print(f"\nSynthetic nested page ({len(html):,} bytes): legacy {legacy_time * 1000:.1f} ms, "
+          f"density {density_time * 1000:.1f} ms, same text: {legacy_text == density_text}")
+
+    if regressions:
+        print(f"\n{regressions} fixture(s) extracted worse than the legacy heuristic.")
+        return 1
+    print("\nDensity extractor matches or beats the legacy heuristic on every fixture.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
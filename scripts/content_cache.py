@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章内容缓存 - 按 URL 保存下载的页面与抽取/清洗结果
+
+设计说明：
+- 键 = URL + 抽取器版本 + HTML 解析器后端的哈希；修改抽取逻辑时递增版本，旧条目自然失效
+- 值 = zlib 压缩的 JSON：原始 HTML、抽取出的正文（找不到正文时为 null）、清洗后的文本及其清洗参数签名
+- 清洗参数（token 预算、预摘要设置）变化时只用缓存的正文重新清洗，不重新下载或解析
+- 条目超过 TTL 视为未命中并删除；总容量超出上限时由 DiskCache 按 LRU 淘汰
+- 大模型调用失败后重跑、回放和实验时，已抓取过的文章不再发起网络请求
+"""
+
+import hashlib
+import json
+import time
+import zlib
+from typing import Dict, Optional
+
+from disk_cache import DiskCache
+
+COMPRESS_LEVEL = 6
+
+
+class ContentCache:
+    """文章内容缓存（压缩存储，TTL + LRU 容量淘汰）"""
+
+    def __init__(self, path: str, max_bytes: int, ttl: float, extractor_version: str, parser: str):
+        """
+        Args:
+            path: 缓存数据库路径
+            max_bytes: 容量上限（字节，按压缩后的大小计算）
+            ttl: 条目有效期（秒，<= 0 表示不过期）
+            extractor_version: 抽取器版本，修改抽取逻辑时需要递增
+            parser: HTML 解析器后端（不同后端建出的树可能不同）
+        """
+        self.cache = DiskCache(path, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.extractor_version = extractor_version
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def make_key(self, url: str) -> str:
+        key_material = json.dumps({
+            'url': url,
+            'extractor_version': self.extractor_version,
+            'parser': self.parser,
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """返回 {'html', 'text', 'cleaned', 'clean_sig', 'fetched_at'}；未命中或已过期时返回 None"""
+        key = self.make_key(url)
+        value = self.cache.get(key)
+        entry = None
+        if value is not None:
+            try:
+                entry = json.loads(zlib.decompress(value).decode('utf-8'))
+            except (zlib.error, UnicodeDecodeError, json.JSONDecodeError):
+                entry = None
+        if not isinstance(entry, dict):
+            self.misses += 1
+            return None
+        if self.ttl > 0 and time.time() - entry.get('fetched_at', 0) > self.ttl:
+            self.expired += 1
+            self.misses += 1
+            self.cache.delete(key)
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, url: str, html: str, text: Optional[str], cleaned: str, clean_sig: str,
+            fetched_at: Optional[float] = None):
+        entry = {
+            'html': html,
+            'text': text,
+            'cleaned': cleaned,
+            'clean_sig': clean_sig,
+            'fetched_at': time.time() if fetched_at is None else fetched_at,
+        }
+        value = zlib.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'), COMPRESS_LEVEL)
+        self.cache.set(self.make_key(url), value)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.cache.stats(), hits=self.hits, misses=self.misses, expired=self.expired)
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文抽取器 - 单次自底向上遍历的文本密度打分
+
+设计说明：
+- 旧的兜底策略对每个 article/div/section/main 复制子树、删除噪音再 get_text，
+  深层嵌套页面会反复遍历同一子树（O(n²)）
+- 这里只做一次后序遍历，同时累计每个节点的文本长度、链接文本长度，
+  并把段落级文本块的得分分配给父节点（全额）和祖父节点（一半）
+- 噪音标签（nav/footer/header/aside/script/style）整棵子树不参与统计
+- 最终得分 = 文本块得分 × (1 - 链接密度)；没有段落结构的页面退化为按有效文本长度选择
+- 选出最佳容器后向上合并：跳过只包了一层的外壳，或兄弟节点中也有相当正文时取父节点
+
+解析器后端：
+- BeautifulSoup 的树构建器可配置：lxml（C 实现，最快）、html5lib、html.parser（纯 Python 兜底）
+- 'auto' 按速度优先选择已安装的后端；指定的后端未安装时回退到 html.parser
+- 建树前用正则剔除 script/style 块，减少需要解析的字节
+- 选择器与兜底逻辑只依赖 BeautifulSoup 接口，在所有后端上完全一致
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, FeatureNotFound, NavigableString, Tag
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
+
+# 修改抽取逻辑（选择器、打分、合并规则）时递增，使内容缓存中的旧抽取结果失效
+EXTRACTOR_VERSION = "density-v1"
+
+NOISE_TAGS = {'nav', 'footer', 'header', 'aside', 'script', 'style', 'noscript'}
+CONTAINER_TAGS = {'article', 'div', 'section', 'main'}
+BLOCK_TAGS = {'p', 'pre', 'blockquote', 'li', 'td'}
+SKIPPED_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+MIN_BLOCK_CHARS = 25  # 文本块最少字符数，太短的块（按钮、标签）不计分
+WRAPPER_SLACK_CHARS = 80  # 父节点比当前节点多出的文本不超过该值时视为外壳（标题、日期等）
+SIBLING_MERGE_RATIO = 0.5  # 兄弟节点正文量达到当前节点的该比例时合并到父节点
+MAX_MERGE_LINK_DENSITY = 0.3
+
+# 常见 CMS 的正文容器选择器，按优先级排列（快速路径）
+CONTENT_SELECTORS = [
+    'article', 'div.article-content', 'div#article-content', 'div.post-content',
+    'div.entry-content', 'section.article-body', 'div.content__article-body',
+    'div.prose', 'div.rich-text', 'div#content', 'main', 'section#content',
+    'div[itemprop="articleBody"]', 'div#main-content',
+]
+
+# 按速度从快到慢排列；html.parser 为标准库自带，始终可用
+PARSER_BACKENDS = ['lxml', 'html5lib', 'html.parser']
+AUTO_PARSERS = ['lxml', 'html.parser']  # html5lib 比 html.parser 更慢，不参与自动选择
+
+SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+_parser_available: Dict[str, bool] = {}
+
+
+def parser_available(name: str) -> bool:
+    """检测 BeautifulSoup 后端是否已安装（结果缓存）"""
+    if name not in _parser_available:
+        try:
+            BeautifulSoup('<p></p>', name)
+            _parser_available[name] = True
+        except FeatureNotFound:
+            _parser_available[name] = False
+    return _parser_available[name]
+
+
+def available_parsers() -> List[str]:
+    return [name for name in PARSER_BACKENDS if parser_available(name)]
+
+
+def resolve_parser(name: str = 'auto') -> str:
+    """把配置的后端名解析为实际可用的后端"""
+    if name == 'auto':
+        for candidate in AUTO_PARSERS:
+            if parser_available(candidate):
+                return candidate
+    if name in PARSER_BACKENDS and parser_available(name):
+        return name
+    print(f"[ContentExtractor] HTML parser '{name}' is not available, falling back to html.parser")
+    return 'html.parser'
+
+
+def strip_script_style(html: str) -> str:
+    """建树前移除 script/style 块"""
+    return SCRIPT_STYLE_RE.sub('', html)
+
+
+def make_soup(html: str, parser: str = 'html.parser') -> BeautifulSoup:
+    return BeautifulSoup(strip_script_style(html), parser)
+
+
+def _block_score(text_len: int, commas: int) -> float:
+    """文本块得分：基础分 + 逗号数 + 长度奖励（每 100 字符 1 分，最多 3 分）"""
+    return 1.0 + commas + min(text_len / 100.0, 3.0)
+
+
+def score_containers(root: Tag) -> Dict[int, Dict]:
+    """
+    一次后序遍历为所有候选容器打分
+
+    Returns:
+        Dict[int, Dict]: id(element) -> {'element', 'text', 'links', 'score', 'content'}
+        其中 content 为子树内全部文本块得分之和（按链接密度折算），用于向上合并
+    """
+    text_len: Dict[int, int] = {}
+    link_len: Dict[int, int] = {}
+    commas: Dict[int, int] = {}
+    block_points: Dict[int, float] = {}
+    content_points: Dict[int, float] = {}
+    containers = []
+
+    # Iterative post-order traversal: (node, children_done)
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        key = id(node)
+        if not children_done:
+            if node.name in NOISE_TAGS:
+                text_len[key] = link_len[key] = commas[key] = content_points[key] = 0
+                continue
+            stack.append((node, True))
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    stack.append((child, False))
+            continue
+
+        # All children have been visited: aggregate
+        total = links = comma_count = 0
+        direct_text = 0
+        content = 0.0
+        for child in node.contents:
+            if isinstance(child, Tag):
+                ckey = id(child)
+                total += text_len[ckey]
+                links += link_len[ckey]
+                comma_count += commas[ckey]
+                content += content_points[ckey]
+            elif isinstance(child, NavigableString) and not isinstance(child, SKIPPED_STRINGS):
+                stripped = child.strip()
+                if stripped:
+                    total += len(stripped)
+                    direct_text += len(stripped)
+                    comma_count += stripped.count(',') + stripped.count('，')
+        if node.name == 'a':
+            links = total
+        text_len[key] = total
+        link_len[key] = links
+        commas[key] = comma_count
+        if node.name in CONTAINER_TAGS:
+            containers.append(node)
+
+        # Paragraph-level blocks feed their parent (full) and grandparent (half)
+        is_block = node.name in BLOCK_TAGS and total >= MIN_BLOCK_CHARS
+        # Sites that separate text with <br> instead of <p>: direct text counts for the node itself
+        if not is_block and node.name in CONTAINER_TAGS and direct_text >= MIN_BLOCK_CHARS:
+            points = _block_score(direct_text, comma_count)
+            block_points[key] = block_points.get(key, 0.0) + points
+            content += points
+        if is_block:
+            points = _block_score(total, comma_count)
+            content += points * (1.0 - links / total)
+            parent = node.parent
+            if parent is not None:
+                block_points[id(parent)] = block_points.get(id(parent), 0.0) + points
+                grandparent = parent.parent
+                if grandparent is not None:
+                    block_points[id(grandparent)] = block_points.get(id(grandparent), 0.0) + points / 2
+        content_points[key] = content
+
+    results = {}
+    for element in containers:
+        key = id(element)
+        if not text_len[key]:
+            continue
+        density = link_len[key] / text_len[key]
+        results[key] = {
+            'element': element,
+            'text': text_len[key],
+            'links': link_len[key],
+            'score': block_points.get(key, 0.0) * (1.0 - density),
+            'content': content_points[key],
+        }
+    return results
+
+
+def _merge_upwards(best: Dict, scored: Dict[int, Dict]) -> Tag:
+    """从最佳容器向上合并：外壳直接穿过；兄弟节点也有相当正文（且链接不多）时取父节点"""
+    current = best
+    while True:
+        parent = scored.get(id(current['element'].parent))
+        if parent is None:
+            break
+        extra_text = parent['text'] - current['text']
+        sibling_content = parent['content'] - current['content']
+        parent_density = parent['links'] / parent['text']
+        if extra_text <= WRAPPER_SLACK_CHARS:
+            current = parent
+        elif (sibling_content >= current['content'] * SIBLING_MERGE_RATIO
+              and parent_density <= MAX_MERGE_LINK_DENSITY):
+            current = parent
+        else:
+            break
+    return current['element']
+
+
+def find_main_container(soup) -> Optional[Tag]:
+    """选出正文容器；返回前移除其中的噪音标签"""
+    root = soup.find('body') or soup
+    scored = score_containers(root)
+    if not scored:
+        return None
+
+    candidates = list(scored.values())
+    best = max(candidates, key=lambda c: c['score'])
+    if best['score'] > 0:
+        element = _merge_upwards(best, scored)
+    else:
+        # No paragraph structure at all: fall back to the most non-link text
+        best = max(candidates, key=lambda c: c['text'] - c['links'])
+        if best['text'] - best['links'] <= 0:
+            return None
+        element = best['element']
+
+    for noise_tag in element.find_all(list(NOISE_TAGS)):
+        noise_tag.decompose()
+    return element
+
+
+def select_article_body(soup, selectors: List[str]) -> Optional[Tag]:
+    """
+    选择正文节点：内容选择器（快速路径）→ 文本密度兜底 → 清理后的 body
+
+    Args:
+        soup: 任意后端构建的 BeautifulSoup 对象
+        selectors: 按优先级排列的 CSS 选择器
+    """
+    # 优先尝试内容选择器
+    for selector in selectors:
+        node = soup.select_one(selector)
+        if node:
+            return node
+
+    # 兜底策略：单次遍历按文本密度为 article/div/section/main 打分，选出正文容器
+    article_body = find_main_container(soup)
+    if article_body:
+        return article_body
+
+    # 最后的兜底：清理后的body
+    body = soup.find('body')
+    if body:
+        for tag in body.find_all(['nav', 'footer', 'header', 'aside', 'script', 'style']):
+            tag.decompose()
+    return body
+
+
+def extract_article_text(html: str, selectors: List[str], parser: str = 'html.parser') -> Optional[str]:
+    """解析 HTML 并返回正文文本；找不到正文时返回 None"""
+    soup = make_soup(html, parser)
+    article_body = select_article_body(soup, selectors)
+    if not article_body:
+        return None
+    return article_body.get_text(separator='\n', strip=True)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅源状态缓存 - 条件请求（ETag / Last-Modified）
+
+设计说明：
+- 以订阅源 URL 为键，持久化 ETag、Last-Modified 与响应体哈希
+- 下次运行发送条件请求；304 或响应体哈希未变时跳过下载后的解析
+- 解析后保存尚未处理的条目（精简字段，按发布时间倒序，最多 BACKLOG_LIMIT 条）；订阅源未变化时
+  直接从这份列表采样候选，积压的条目每次运行照常往下消化，被永久跳过的条目也不会导致反复完整拉取
+- 按订阅源累计完整拉取与跳过的次数（fetches / skips），用于观察条件请求的实际效果
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+BACKLOG_LIMIT = 50  # Unprocessed entries kept per feed for runs where the feed is unchanged
+ENTRY_FIELDS = ('title', 'link', 'published_parsed', 'content')  # What Stage 2 reads from an entry
+
+
+def compact_entry(entry) -> Dict:
+    """feedparser 条目 -> 可 JSON 序列化的精简条目"""
+    compact = {'title': entry.get('title', ''), 'link': entry.get('link', '')}
+    published_parsed = entry.get('published_parsed')
+    if published_parsed:
+        compact['published_parsed'] = list(published_parsed)
+    content = entry.get('content')
+    if isinstance(content, list) and content:
+        compact['content'] = [{'value': content[0].get('value', '') or ''}]
+    return compact
+
+
+def restore_entry(compact: Dict) -> Dict:
+    entry = {key: compact[key] for key in ENTRY_FIELDS if key in compact}
+    if entry.get('published_parsed'):
+        entry['published_parsed'] = time.struct_time(tuple(entry['published_parsed']))
+    return entry
+
+
+class FeedStateCache:
+    """订阅源状态缓存（线程安全）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._states = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                states = json.load(f)
+            return states if isinstance(states, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, url: str) -> Dict:
+        with self._lock:
+            return dict(self._states.get(url, {}))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        生成条件请求头
+
+        没有保存条目列表的状态（首次运行或旧版本的状态）返回空字典，强制完整拉取
+        """
+        state = self.get(url)
+        if not self.is_usable(state):
+            return {}
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    @staticmethod
+    def is_usable(state: Dict) -> bool:
+        """状态中有上次解析保存的条目列表，订阅源未变化时可以代替解析结果"""
+        return isinstance(state.get('entries'), list)
+
+    def is_unchanged(self, url: str, body: bytes) -> bool:
+        """响应体与上次相同（且有可用的条目列表）"""
+        state = self.get(url)
+        return self.is_usable(state) and state.get('body_hash') == self.body_hash(body)
+
+    def touch(self, url: str):
+        """订阅源未变化，仅刷新检查时间并计一次跳过"""
+        with self._lock:
+            if url in self._states:
+                state = self._states[url]
+                state['checked_at'] = int(time.time())
+                state['skips'] = state.get('skips', 0) + 1
+
+    def update(self, url: str, headers, body: bytes):
+        """记录新的校验信息（条目列表在分桶后通过 set_entries 写入）"""
+        with self._lock:
+            state = self._states.setdefault(url, {})
+            state['etag'] = headers.get('etag') or ''
+            state['last_modified'] = headers.get('last-modified') or ''
+            state['body_hash'] = self.body_hash(body)
+            state['checked_at'] = int(time.time())
+            state['fetches'] = state.get('fetches', 0) + 1
+
+    def skip_totals(self) -> Tuple[int, int]:
+        """所有订阅源累计的 (跳过次数, 检查次数)"""
+        with self._lock:
+            skips = sum(state.get('skips', 0) for state in self._states.values())
+            fetches = sum(state.get('fetches', 0) for state in self._states.values())
+        return skips, skips + fetches
+
+    def set_entries(self, url: str, entries: List):
+        """保存解析出的未处理条目（调用方已按发布时间倒序排列）"""
+        compact = [compact_entry(entry) for entry in entries[:BACKLOG_LIMIT]]
+        with self._lock:
+            if url in self._states:
+                self._states[url].pop('pending', None)  # Replaced by the entry list
+                self._states[url]['entries'] = compact
+
+    def entries(self, url: str) -> List[Dict]:
+        """上次解析保存的条目（未变化的订阅源用它采样候选）"""
+        with self._lock:
+            compact = list(self._states.get(url, {}).get('entries', []))
+        return [restore_entry(entry) for entry in compact]
+
+    def save(self):
+        """原子写入：先写临时文件再替换"""
+        with self._lock:
+            data = json.dumps(self._states, indent=2, ensure_ascii=False, sort_keys=True)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
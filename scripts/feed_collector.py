@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发RSS采集器 - Stage 1 候选条目收集
+
+设计说明：
+- 多线程并发拉取订阅源，每个源有独立的连接/读取超时
+- 全局截止时间：到点仍未完成的源直接放弃，不拖累整个运行
+- 结果按 source.json 中的顺序汇总，候选桶与串行版本完全一致
+- 可选的 FeedStateCache：发送条件请求，未变化的订阅源不做解析，直接从上次保存的未处理条目中采样
+- 可选的 RunMetrics：按来源记录每个订阅源的耗时、下载字节数与错误类型
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import feedparser
+import requests
+
+from feed_cache import FeedStateCache
+from http_client import HttpClient
+from metrics import RunMetrics
+
+CHUNK_SIZE = 64 * 1024
+
+# fetch_feed 的返回值：订阅源自上次运行以来没有变化
+UNCHANGED = object()
+
+
+def entry_pubdate(entry):
+    """Get the publication time (datetime) of an entry. Return datetime.min if none exists for sorting to the end."""
+    pp = entry.get('published_parsed')
+    if pp:
+        return datetime.fromtimestamp(time.mktime(pp))
+    return datetime.min
+
+
+class FeedTimeoutError(Exception):
+    """单个订阅源超过全局截止时间"""
+
+
+class FeedCollector:
+    """并发订阅源采集器"""
+
+    def __init__(self, workers: int = 8, connect_timeout: float = 5.0,
+                 read_timeout: float = 15.0, deadline: float = 120.0,
+                 state_cache: Optional[FeedStateCache] = None,
+                 http_client: Optional[HttpClient] = None,
+                 metrics: Optional[RunMetrics] = None):
+        self.workers = max(1, workers)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.state_cache = state_cache
+        self.http_client = http_client or HttpClient(pool_maxsize=self.workers)
+        self.metrics = metrics
+        self.stats = {'sources': 0, 'fetched': 0, 'unchanged': 0, 'failed': 0, 'timed_out': 0}
+
+    def fetch_feed(self, url: str, deadline_at: float, source: Optional[str] = None):
+        """
+        下载并解析单个订阅源；读取过程中检查全局截止时间
+
+        启用状态缓存时发送条件请求，304 或响应体哈希未变化时返回 UNCHANGED（不解析）
+        """
+        if self.metrics is None:
+            return self._fetch_feed(url, deadline_at)
+        # Errors are classified in collect(), where timeouts and deadline misses are also known
+        with self.metrics.timer('feed', source, record_errors=False):
+            return self._fetch_feed(url, deadline_at, source)
+
+    def _fetch_feed(self, url: str, deadline_at: float, source: Optional[str] = None):
+        headers = {}
+        if self.state_cache is not None:
+            headers.update(self.state_cache.conditional_headers(url))
+        with self.http_client.get(url, headers=headers, stream=True,
+                                  timeout=(self.connect_timeout, self.read_timeout)) as resp:
+            if resp.status_code == 304 and self.state_cache is not None:
+                self.state_cache.touch(url)
+                return UNCHANGED
+            resp.raise_for_status()
+            chunks = []
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                if time.monotonic() > deadline_at:
+                    raise FeedTimeoutError(f"global deadline of {self.deadline}s exceeded")
+                chunks.append(chunk)
+            body = b''.join(chunks)
+            if self.metrics is not None:
+                self.metrics.count('feed_bytes', len(body), source)
+            response_headers = {k.lower(): v for k, v in resp.headers.items()}
+
+        if self.state_cache is not None:
+            if self.state_cache.is_unchanged(url, body):
+                self.state_cache.touch(url)
+                return UNCHANGED
+            self.state_cache.update(url, response_headers, body)
+        return feedparser.parse(body, response_headers=response_headers)
+
+    def collect(self, sources: List[Dict], processed_links, max_per_source: int) -> Dict[str, List]:
+        """
+        并发拉取所有订阅源并按来源分桶
+
+        Args:
+            sources: source.json 中的订阅源列表
+            processed_links: 已处理链接集合（仅做成员判断）
+            max_per_source: 每个来源最多采样的候选数
+
+        Returns:
+            Dict[str, List]: { source_name: [entry, ...] }，顺序与 sources 一致
+        """
+        jobs = [(s.get('name', ''), s.get('url', '')) for s in sources]
+        jobs = [(name, url) for name, url in jobs if url]
+        self.stats = {key: 0 for key in self.stats}
+        self.stats['sources'] = len(jobs)
+
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        outcomes = [None] * len(jobs)  # (feed, error) per job, kept in source order
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='feed')
+        try:
+            futures = {executor.submit(self.fetch_feed, url, deadline_at, name): i
+                       for i, (name, url) in enumerate(jobs)}
+            done, not_done = wait(futures, timeout=max(0.0, deadline_at - time.monotonic()))
+            for future in done:
+                i = futures[future]
+                try:
+                    outcomes[i] = (future.result(), None)
+                except Exception as e:
+                    outcomes[i] = (None, e)
+            for future in not_done:
+                future.cancel()
+                outcomes[futures[future]] = (None, FeedTimeoutError(f"global deadline of {self.deadline}s exceeded"))
+        finally:
+            # Don't block on stragglers; they stop themselves at the deadline check
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        candidates_by_source = {}
+        for (source_name, rss_url), (feed, error) in zip(jobs, outcomes):
+            print(f"--- Collecting candidates: {source_name} ---")
+            if error is not None:
+                if self.metrics is not None:
+                    self.metrics.error('feed', type(error).__name__, source_name)
+                if isinstance(error, (FeedTimeoutError, requests.Timeout)):
+                    self.stats['timed_out'] += 1
+                    print(f"[Collecting candidates] Source '{source_name}' timed out: {error}")
+                else:
+                    self.stats['failed'] += 1
+                    print(f"[Collecting candidates] Source '{source_name}' parsing error: {error}")
+                continue
+
+            if feed is UNCHANGED:
+                # Not parsed again: sample from the unprocessed entries saved when it last changed
+                self.stats['unchanged'] += 1
+                if self.metrics is not None:
+                    self.metrics.count('feeds_unchanged', 1, source_name)
+                bucket, _ = self._build_bucket(self.state_cache.entries(rss_url), processed_links, max_per_source)
+                bucket = bucket or []
+                print("  Feed unchanged since last run, not parsed; sampling the saved entries.")
+            else:
+                self.stats['fetched'] += 1
+                bucket, unprocessed = self._build_bucket(feed.entries, processed_links, max_per_source)
+                if self.state_cache is not None:
+                    self.state_cache.set_entries(rss_url, unprocessed)
+            if self.metrics is not None:
+                self.metrics.count('candidates', len(bucket or []), source_name)
+            if bucket is None:
+                print("  No content found.")
+            elif bucket:
+                candidates_by_source[source_name] = bucket
+                print(f"  {len(bucket)} candidates.")
+            else:
+                print("  No new candidates available (all processed or no links).")
+
+        elapsed = time.monotonic() - started
+        print(f"[FeedCollector] {self.stats['fetched']}/{self.stats['sources']} feeds fetched in {elapsed:.1f}s "
+              f"(workers={self.workers}, unchanged={self.stats['unchanged']}, "
+              f"failed={self.stats['failed']}, timed_out={self.stats['timed_out']})")
+        if self.state_cache is not None:
+            skips, checks = self.state_cache.skip_totals()
+            if checks:
+                print(f"[FeedCollector] Conditional GET avoided re-parsing {skips} of {checks} feed checks so far "
+                      f"({skips / checks:.0%}).")
+            try:
+                self.state_cache.save()
+            except OSError as e:
+                print(f"[FeedCollector] Warning: failed to save feed state cache: {e}")
+        return candidates_by_source
+
+    @staticmethod
+    def _build_bucket(entries, processed_links, max_per_source: int) -> Tuple[Optional[List], List]:
+        """
+        按发布时间倒序采样未处理条目
+
+        Returns:
+            (bucket, unprocessed): 候选桶（订阅源为空时为 None）与全部未处理条目（按发布时间倒序，供状态缓存保存）
+        """
+        if not entries:
+            return None, []
+
+        # Sort this source by time in descending order
+        sorted_entries = sorted(entries, key=entry_pubdate, reverse=True)
+
+        # Sample to candidate pool (unprocessed only)
+        unprocessed = [e for e in sorted_entries if (e.get('link') or '') and e.get('link') not in processed_links]
+        return unprocessed[:max_per_source], unprocessed
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端 - 订阅源、文章抓取和 OpenRouter 调用共用同一个连接池
+
+设计说明：
+- 基于 requests.Session：按主机维护连接池，复用 keep-alive 连接，省去重复的 TLS 握手
+- 显式协商压缩传输（gzip/deflate，安装 brotli 时追加 br）
+- 连接池大小、超时和默认请求头集中在这里配置
+"""
+
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (compatible; CuratedGemsBot/1.0; +https://github.com/zhaomiao413-glitch/curated-gems)'
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def _accept_encoding() -> str:
+    """urllib3 只有在安装了 brotli/brotlicffi 时才能解码 br"""
+    encodings = ['gzip', 'deflate']
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            encodings.append('br')
+            break
+        except ImportError:
+            continue
+    return ', '.join(encodings)
+
+
+class HttpClient:
+    """带连接池的HTTP客户端（可在多线程间共享）"""
+
+    def __init__(self, pool_connections: int = 32, pool_maxsize: int = 16,
+                 connect_timeout: float = 5.0, read_timeout: float = 20.0,
+                 user_agent: str = DEFAULT_USER_AGENT, headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            pool_connections: 缓存连接池的主机数量
+            pool_maxsize: 每个主机保持的最大连接数（应不小于并发线程数）
+            connect_timeout: 默认连接超时（秒）
+            read_timeout: 默认读取超时（秒）
+            user_agent: 所有请求使用的 User-Agent
+            headers: 额外的默认请求头
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': _accept_encoding(),
+            'Connection': 'keep-alive',
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已处理链接库 - 按哈希排序的追加式链接日志
+
+设计说明：
+- 每行一条记录：`<16 位十六进制 URL 哈希> <URL>`，哈希用于查找，URL 保留用于导出
+- 文件 = 定宽头部 + 按哈希排序区 + 追加区：
+  - 排序区通过 mmap 按行二分查找，启动时不需要把全部链接读入内存
+  - 每次运行新增的链接只追加到文件末尾，git diff 只有新增的几行
+- 追加区超过阈值时压缩：合并进排序区并去重（临时文件 + 原子替换）
+- 文件不存在时自动从旧的 processed_links.json 迁移；export 子命令导出旧的 JSON 格式
+
+用法：
+    python scripts/link_store.py stats   [--store PATH]
+    python scripts/link_store.py compact [--store PATH]
+    python scripts/link_store.py migrate [--store PATH] [--legacy PATH]
+    python scripts/link_store.py export  [--store PATH] [--out PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HASH_HEX_CHARS = 16
+HEADER_FORMAT = "#processed-links v1 sorted={:010d} bytes={:012d}\n"
+HEADER_SIZE = len(HEADER_FORMAT.format(0, 0))
+HEADER_PREFIX = b"#processed-links v1 "
+
+
+def link_hash(link: str) -> bytes:
+    """链接的定宽哈希（16 位小写十六进制，64 位）"""
+    return hashlib.sha256(link.encode('utf-8')).hexdigest()[:HASH_HEX_CHARS].encode('ascii')
+
+
+def _record(key: bytes, link: str) -> bytes:
+    return key + b' ' + link.encode('utf-8') + b'\n'
+
+
+class LinkStore:
+    """已处理链接集合：支持 `link in store`、`store.add(link)` 与 `len(store)`"""
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None,
+                 compact_ratio: float = 0.25, compact_min: int = 1000):
+        """
+        Args:
+            path: 链接日志文件路径
+            legacy_json_path: 旧的 processed_links.json；日志不存在时从它迁移
+            compact_ratio: 追加区超过排序区的该比例时，save() 顺带压缩
+            compact_min: 追加区至少达到该条数才会自动压缩
+        """
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.migrated = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._sorted_count = 0
+        self._sorted_end = HEADER_SIZE
+        self._tail: Dict[bytes, str] = {}   # 追加区（含本次新增）：哈希 -> URL
+        self._pending: List[bytes] = []     # 本次运行新增、尚未写盘的哈希
+
+        if not os.path.exists(path):
+            links = load_legacy_json(legacy_json_path) if legacy_json_path else []
+            records = {link_hash(link): link for link in links}
+            write_store(path, sorted(records.items()))
+            self.migrated = len(records)
+        self._open()
+
+    # ---------- 读取 ----------
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        header = self._file.read(HEADER_SIZE)
+        try:
+            if not header.startswith(HEADER_PREFIX):
+                raise ValueError
+            fields = dict(part.split(b'=') for part in header[len(HEADER_PREFIX):].split())
+            self._sorted_count = int(fields[b'sorted'])
+            self._sorted_end = HEADER_SIZE + int(fields[b'bytes'])
+        except (ValueError, KeyError):
+            self._file.close()
+            raise ValueError(f"{self.path} is not a processed-links store")
+        if os.fstat(self._file.fileno()).st_size > HEADER_SIZE:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._file.seek(self._sorted_end)
+        self._tail = {}
+        for line in self._file.read().splitlines():
+            key, _, link = line.partition(b' ')
+            if len(key) == HASH_HEX_CHARS:
+                self._tail[key] = link.decode('utf-8', errors='replace')
+
+    def _in_sorted(self, key: bytes) -> bool:
+        """在排序区按行二分查找（每次把中点对齐到所在行的行首）"""
+        data = self._mmap
+        lo, hi = HEADER_SIZE, self._sorted_end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            line_start = data.rfind(b'\n', lo, mid) + 1 or lo
+            value = data[line_start:line_start + HASH_HEX_CHARS]
+            if value < key:
+                lo = data.find(b'\n', line_start, hi) + 1 or hi
+            elif value > key:
+                hi = line_start
+            else:
+                return True
+        return False
+
+    def _contains_key(self, key: bytes) -> bool:
+        if key in self._tail:
+            return True
+        return self._sorted_count > 0 and self._in_sorted(key)
+
+    def __contains__(self, link: str) -> bool:
+        return self._contains_key(link_hash(link))
+
+    def __len__(self) -> int:
+        return self._sorted_count + len(self._tail)
+
+    def stats(self) -> Dict[str, int]:
+        """{'links', 'sorted', 'appended', 'bytes'}：总条数、排序区与追加区条数、文件大小"""
+        with self._lock:
+            return {
+                'links': len(self),
+                'sorted': self._sorted_count,
+                'appended': len(self._tail),
+                'bytes': os.path.getsize(self.path),
+            }
+
+    def items(self) -> Iterator[Tuple[bytes, str]]:
+        """按文件顺序遍历 (哈希, URL)：先排序区，再追加区"""
+        if self._sorted_count:
+            for line in self._mmap[HEADER_SIZE:self._sorted_end].splitlines():
+                key, _, link = line.partition(b' ')
+                yield key, link.decode('utf-8', errors='replace')
+        yield from self._tail.items()
+
+    # ---------- 写入 ----------
+
+    def add(self, link: str):
+        key = link_hash(link)
+        with self._lock:
+            if self._contains_key(key):
+                return
+            self._tail[key] = link
+            self._pending.append(key)
+
+    def save(self):
+        """把本次新增的链接追加到文件末尾；追加区过大时顺带压缩"""
+        with self._lock:
+            if self._pending:
+                with open(self.path, 'ab') as f:
+                    f.write(b''.join(_record(key, self._tail[key]) for key in self._pending))
+                self._pending = []
+            tail_size = len(self._tail)
+        if tail_size >= self.compact_min and tail_size > self._sorted_count * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """把追加区合并进排序区并去重，原子替换文件"""
+        with self._lock:
+            records = dict(self.items())
+            self._close()
+            write_store(self.path, sorted(records.items()))
+            self._pending = []
+            self._open()
+
+    def _close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close()
+
+
+def write_store(path: str, records: List[Tuple[bytes, str]]):
+    """写出只有排序区的日志文件（records 需已按哈希排序）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    body = b''.join(_record(key, link) for key, link in records)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER_FORMAT.format(len(records), len(body)).encode('ascii'))
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def load_legacy_json(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            links = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    return [link for link in links if isinstance(link, str)]
+
+
+def main():
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Maintain the processed-links store')
+    parser.add_argument('command', choices=['stats', 'compact', 'migrate', 'export'])
+    parser.add_argument('--store', default=os.path.join(scripts_dir, 'processed_links.idx'))
+    parser.add_argument('--legacy', default=os.path.join(scripts_dir, 'processed_links.json'),
+                        help='legacy JSON list to migrate from')
+    parser.add_argument('--out', default='-', help='export destination (default: stdout)')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        store = LinkStore(args.store)
+        before = len(store)
+        for link in load_legacy_json(args.legacy):
+            store.add(link)
+        store.save()
+        store.compact()
+        print(f"[LinkStore] Migrated {len(store) - before} links from {args.legacy}; {len(store)} total in {args.store}.")
+        store.close()
+        return 0
+
+    if not os.path.exists(args.store):
+        print(f"[LinkStore] {args.store} does not exist (run 'migrate' first).")
+        return 1
+    store = LinkStore(args.store)
+    if args.command == 'stats':
+        stats = store.stats()
+        print(f"[LinkStore] {stats['links']} links: {stats['sorted']} sorted, {stats['appended']} appended, "
+              f"{stats['bytes'] / 1024:.1f} KB.")
+    elif args.command == 'compact':
+        store.compact()
+        print(f"[LinkStore] Compacted {args.store}: {len(store)} links.")
+    elif args.command == 'export':
+        # Same layout the old processed_links.json used
+        payload = json.dumps(sorted(link for _, link in store.items()), indent=2, ensure_ascii=False)
+        if args.out == '-':
+            print(payload)
+        else:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.write(payload)
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标 - 各阶段耗时、计数、字节数与错误分类，输出机器可读的运行报告
+
+设计说明：
+- 每个阶段记录每次执行的耗时（秒），汇总时给出次数、总耗时与 p50/p90/p99/max
+- 计数器（候选数、条目数、下载字节数等）与错误分类（阶段 + 异常类名）同时按来源和全局累计
+- 线程安全：预取线程、事件循环与打标线程会同时写入
+- 报告写成 JSON（与 data.json 放在一起），可选同时写 Prometheus 文本格式（textfile collector）
+- 可选的 StageProfiler：timer() 包住的每个阶段同时交给 profiler 剖析
+- 进程峰值内存取自 getrusage（Linux 单位为 KB，macOS 为字节）
+"""
+
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+REPORT_VERSION = 1
+PROMETHEUS_PREFIX = 'rss_analyzer'
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近秩百分位（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _atomic_write_text(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+class RunMetrics:
+    """一次运行的阶段耗时、计数与错误分类"""
+
+    def __init__(self, profiler=None):
+        """
+        Args:
+            profiler: 可选的 StageProfiler，timer() 计时的阶段同时被剖析
+        """
+        self.profiler = profiler
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._counters: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}  # "stage:ErrorClass" -> count
+        self._sources: Dict[str, Dict] = {}
+
+    def _source(self, source: str) -> Dict:
+        return self._sources.setdefault(source, {'stages': {}, 'counters': {}, 'errors': {}})
+
+    def observe(self, stage: str, seconds: float, source: Optional[str] = None):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+            if source is not None:
+                stats = self._source(source)['stages'].setdefault(stage, {'count': 0, 'total_s': 0.0})
+                stats['count'] += 1
+                stats['total_s'] += seconds
+
+    def count(self, name: str, amount: int = 1, source: Optional[str] = None):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            if source is not None:
+                counters = self._source(source)['counters']
+                counters[name] = counters.get(name, 0) + amount
+
+    def error(self, stage: str, error_class: str, source: Optional[str] = None):
+        key = f"{stage}:{error_class}"
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+            if source is not None:
+                errors = self._source(source)['errors']
+                errors[key] = errors.get(key, 0) + 1
+
+    @contextmanager
+    def timer(self, stage: str, source: Optional[str] = None, record_errors: bool = True):
+        """with metrics.timer('extract', source): ...  —— 异常同样计入耗时，并按异常类名记一次错误"""
+        with self.profile(stage):
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception as e:
+                if record_errors:
+                    self.error(stage, type(e).__name__, source)
+                raise
+            finally:
+                self.observe(stage, time.perf_counter() - started, source)
+
+    @contextmanager
+    def profile(self, stage: str):
+        """只剖析不计时（未启用 profiler 时什么也不做）"""
+        if self.profiler is None:
+            yield
+        else:
+            with self.profiler.stage(stage):
+                yield
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'total_s': sum(values),
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p90_ms': percentile(values, 0.90) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': values[-1] * 1000,
+            }
+            for stage, values in samples.items()
+        }
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def snapshot(self) -> Dict:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        stages = self.stage_summary()
+        with self._lock:
+            return {
+                'version': REPORT_VERSION,
+                'started_at': self.started_at,
+                'finished_at': time.time(),
+                'wall_s': self.elapsed(),
+                'cpu_user_s': usage.ru_utime,
+                'cpu_system_s': usage.ru_stime,
+                'peak_rss_mb': peak_rss_mb(),
+                'stages': stages,
+                'counters': dict(self._counters),
+                'errors': dict(self._errors),
+                'sources': json.loads(json.dumps(self._sources)),
+            }
+
+    def write_json(self, path: str, **extra) -> Dict:
+        """写出运行报告（临时文件 + os.replace），返回报告内容"""
+        report = self.snapshot()
+        report.update(extra)
+        _atomic_write_text(path, json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+
+    @staticmethod
+    def to_prometheus(report: Dict) -> str:
+        """把运行报告转换为 Prometheus 文本格式"""
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# TYPE {p}_run_wall_seconds gauge", f"{p}_run_wall_seconds {report['wall_s']:.6f}",
+            f"# TYPE {p}_run_cpu_seconds gauge",
+            f'{p}_run_cpu_seconds{{mode="user"}} {report["cpu_user_s"]:.6f}',
+            f'{p}_run_cpu_seconds{{mode="system"}} {report["cpu_system_s"]:.6f}',
+            f"# TYPE {p}_run_peak_rss_bytes gauge", f"{p}_run_peak_rss_bytes {int(report['peak_rss_mb'] * 1024 * 1024)}",
+            f"# TYPE {p}_run_finished_timestamp_seconds gauge",
+            f"{p}_run_finished_timestamp_seconds {report['finished_at']:.3f}",
+            f"# TYPE {p}_stage_duration_seconds summary",
+        ]
+        for stage, stats in sorted(report['stages'].items()):
+            for quantile in QUANTILES:
+                value = stats[f"p{int(quantile * 100)}_ms"] / 1000
+                lines.append(f'{p}_stage_duration_seconds{{stage="{_label(stage)}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{p}_stage_duration_seconds_sum{{stage="{_label(stage)}"}} {stats["total_s"]:.6f}')
+            lines.append(f'{p}_stage_duration_seconds_count{{stage="{_label(stage)}"}} {stats["count"]}')
+        for name in sorted(report['counters']):
+            metric = f"{p}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            # Only per-source series, so sum() over the metric gives the run total; the remainder recorded
+            # without a source goes to source=""
+            unattributed_count = report['counters'][name]
+            for source, stats in sorted(report['sources'].items()):
+                if name in stats['counters']:
+                    unattributed_count -= stats['counters'][name]
+                    lines.append(f'{metric}{{source="{_label(source)}"}} {stats["counters"][name]}')
+            if unattributed_count > 0:
+                lines.append(f'{metric}{{source=""}} {unattributed_count}')
+        lines.append(f"# TYPE {p}_errors_total counter")
+        unattributed = dict(report['errors'])  # errors recorded without a source get source=""
+        for source, stats in sorted(report['sources'].items()):
+            for key, value in sorted(stats['errors'].items()):
+                unattributed[key] = unattributed.get(key, 0) - value
+                stage, _, error_class = key.partition(':')
+                lines.append(f'{p}_errors_total{{source="{_label(source)}",stage="{_label(stage)}",'
+                             f'error="{_label(error_class)}"}} {value}')
+        for key, value in sorted(unattributed.items()):
+            if value > 0:
+                stage, _, error_class = key.partition(':')
+                lines.append(f'{p}_errors_total{{source="",stage="{_label(stage)}",'
+                             f'error="{_label(error_class)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, report: Dict):
+        _atomic_write_text(path, self.to_prometheus(report))
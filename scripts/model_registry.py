@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型能力注册表与本地 token 估算
+
+设计说明：
+- 注册表记录每个模型的上下文窗口与最大输出 token，替代按字符数的硬编码表
+- 查找顺序：精确匹配 → 去掉 ":free" 等变体后缀 → 最长前缀匹配（带日期/版本后缀的模型名）→ 保守默认值，
+  不再按名称片段做模糊匹配
+- token 估算不依赖分词器：CJK 字符约 1 token/字，其余文本约 4 字符/token
+- 正文预算 = 上下文窗口 - 提示词模板 - 输出上限 - 安全余量
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict
+
+CJK_RE = re.compile(r'[\u3000-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+CHARS_PER_TOKEN = 4
+SAFETY_MARGIN = 0.05  # 估算误差余量（上下文窗口的比例）
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """模型能力"""
+    name: str
+    context_tokens: int
+    max_output_tokens: int
+
+
+MODEL_REGISTRY: Dict[str, ModelSpec] = {spec.name: spec for spec in [
+    # Mistral models
+    ModelSpec("mistralai/mistral-small-3.2-24b-instruct", 131072, 16384),
+    ModelSpec("mistralai/mistral-small-3.1-24b-instruct", 131072, 16384),
+    ModelSpec("mistralai/mistral-small", 32768, 8192),
+    ModelSpec("mistralai/mistral-medium", 131072, 16384),
+    ModelSpec("mistralai/mistral-large", 131072, 16384),
+
+    # Google Gemini models
+    ModelSpec("google/gemini-2.5-flash", 1048576, 65535),
+    ModelSpec("google/gemini-2.5-pro", 1048576, 65536),
+    ModelSpec("google/gemini-2.5-flash-lite", 1048576, 65535),
+    ModelSpec("google/gemini-2.0-flash", 1048576, 8192),
+    ModelSpec("google/gemini-1.5-pro", 2097152, 8192),
+    ModelSpec("google/gemini-1.5-flash", 1048576, 8192),
+
+    # OpenAI models
+    ModelSpec("openai/gpt-4o", 128000, 16384),
+    ModelSpec("openai/gpt-4o-mini", 128000, 16384),
+    ModelSpec("openai/gpt-4-turbo", 128000, 4096),
+    ModelSpec("openai/gpt-3.5-turbo", 16385, 4096),
+
+    # Anthropic models
+    ModelSpec("anthropic/claude-3.5-sonnet", 200000, 8192),
+    ModelSpec("anthropic/claude-3-opus", 200000, 4096),
+    ModelSpec("anthropic/claude-3-haiku", 200000, 4096),
+]}
+
+DEFAULT_SPEC = ModelSpec("default", 16384, 4096)  # 未知模型：保守默认值
+
+
+def get_model_spec(model_name: str) -> ModelSpec:
+    """查找模型能力；未登记的模型返回保守默认值"""
+    if model_name in MODEL_REGISTRY:
+        return MODEL_REGISTRY[model_name]
+    base = model_name.split(':', 1)[0]  # "...:free" / "...:beta" variants share the base limits
+    if base in MODEL_REGISTRY:
+        return MODEL_REGISTRY[base]
+    # Dated or versioned names ("openai/gpt-4o-2024-08-06"): longest registered prefix at a "-" boundary
+    matches = [name for name in MODEL_REGISTRY if base.startswith(name + '-')]
+    if matches:
+        return MODEL_REGISTRY[max(matches, key=len)]
+    return DEFAULT_SPEC
+
+
+def estimate_tokens(text: str) -> int:
+    """估算 token 数：CJK 字符各算 1 个，其余按 4 字符/token"""
+    if not text:
+        return 0
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, budget: int, from_end: bool = False) -> str:
+    """
+    截取不超过 budget 个 token 的前缀（from_end=True 时截取后缀）
+
+    估算函数对前缀单调，二分查找字符位置
+    """
+    if budget <= 0:
+        return ''
+    if estimate_tokens(text) <= budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        piece = text[-mid:] if from_end else text[:mid]
+        if estimate_tokens(piece) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    if lo == 0:
+        return ''
+    return text[-lo:] if from_end else text[:lo]
+
+
+def content_token_budget(spec: ModelSpec, prompt_tokens: int, max_output_tokens: int, cap: int = 0) -> int:
+    """
+    正文可用的 token 预算
+
+    Args:
+        spec: 模型能力
+        prompt_tokens: 不含正文的提示词模板 token 数（含标题余量）
+        max_output_tokens: 请求的 max_tokens
+        cap: 额外上限（控制单次调用成本），<= 0 表示不限制
+    """
+    budget = spec.context_tokens - prompt_tokens - max_output_tokens - int(spec.context_tokens * SAFETY_MARGIN)
+    if cap > 0:
+        budget = min(budget, cap)
+    return max(budget, 0)
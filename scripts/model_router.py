@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型回退链与对冲请求 - 有序的模型列表，每个模型单独的超时
+
+设计说明：
+- 模型按配置顺序排列（主模型在前），每个模型有自己的超时；调用失败或超时后换下一个模型
+- 超时、对冲计时和延迟样本都从请求真正发出时算起：客户端在并发槽位和限流器前排队的时间、
+  response_format 回退重试之前的那次请求都不计入（由客户端通过 timing 字典报告）
+- 对冲：最近发出的请求超过该模型历史延迟的某个百分位（默认 p90）仍未回答时，
+  不等它结束，同时向下一个模型发出请求；先成功的回答胜出，其余请求被取消
+- 延迟样本（只记成功的调用，发出到收到回复）按模型保存在 CACHE_DIR，跨运行累积；样本不足时不对冲
+- 对冲和回退产生的额外请求通过 spend() 回调向调用方申请预算，预算用尽时不再发出
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import percentile
+
+MAX_LATENCY_SAMPLES = 200  # Most recent successful calls kept per model
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    name: str
+    timeout: float  # Seconds from launch until the call is given up
+
+
+def parse_model_chain(primary: str, fallbacks: str, default_timeout: float) -> List[ModelRoute]:
+    """'model-a@30, model-b' -> 主模型 + 回退模型（@秒数 为该模型的超时，省略时用默认值）"""
+    routes = [ModelRoute(primary, default_timeout)]
+    for entry in fallbacks.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, timeout = entry.rpartition('@') if '@' in entry else (entry, '', '')
+        route = ModelRoute(name.strip(), float(timeout) if timeout else default_timeout)
+        if route.name not in [r.name for r in routes]:
+            routes.append(route)
+    return routes
+
+
+class LatencyHistory:
+    """每个模型最近成功调用的延迟（秒），持久化为 JSON"""
+
+    def __init__(self, path: str, max_samples: int = MAX_LATENCY_SAMPLES):
+        self.path = path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = self._load()
+
+    def _load(self) -> Dict[str, List[float]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                samples = json.load(f)
+            return {model: [float(v) for v in values] for model, values in samples.items()
+                    if isinstance(values, list)} if isinstance(samples, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError, TypeError, ValueError):
+            return {}
+
+    def observe(self, model: str, seconds: float):
+        with self._lock:
+            values = self._samples.setdefault(model, [])
+            values.append(round(seconds, 4))
+            del values[:-self.max_samples]
+
+    def quantile(self, model: str, fraction: float, min_samples: int = 1) -> Optional[float]:
+        """延迟的百分位；样本少于 min_samples 时返回 None"""
+        with self._lock:
+            values = sorted(self._samples.get(model, []))
+        if len(values) < max(1, min_samples):
+            return None
+        return percentile(values, fraction)
+
+    def count(self, model: str) -> int:
+        with self._lock:
+            return len(self._samples.get(model, []))
+
+    def save(self):
+        """原子写入：先写临时文件再替换"""
+        with self._lock:
+            data = json.dumps(self._samples, indent=2, sort_keys=True)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+class ModelRouter:
+    """按回退链调用模型，慢于历史百分位时对冲到下一个模型"""
+
+    def __init__(self, routes: List[ModelRoute], history: LatencyHistory,
+                 hedge_quantile: float = 0.9, hedge_min_samples: int = 5):
+        """
+        Args:
+            routes: 有序的模型列表（主模型在前）
+            history: 延迟历史
+            hedge_quantile: 触发对冲的延迟百分位（<= 0 关闭对冲，只做失败回退）
+            hedge_min_samples: 模型至少有这么多延迟样本才会对冲
+        """
+        self.routes = routes
+        self.history = history
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.stats = {'calls': 0, 'hedges': 0, 'hedge_wins': 0, 'fallbacks': 0, 'timeouts': 0, 'wins': {}}
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """该模型发出多久后仍未回答时对冲（秒）；None 表示不对冲"""
+        if self.hedge_quantile <= 0:
+            return None
+        return self.history.quantile(model, self.hedge_quantile, self.hedge_min_samples)
+
+    @staticmethod
+    async def _call_route(call, route: ModelRoute, timing: Dict):
+        """调用一个模型；超时从请求发出（timing['sent'] 置位）时开始计算，排队时间不计入"""
+        task = asyncio.ensure_future(call(route.name, timing))
+        sent = asyncio.ensure_future(timing['sent'].wait())
+        try:
+            await asyncio.wait({task, sent}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                return task.result()
+            remaining = route.timeout - (time.perf_counter() - timing['sent_at'])
+            return await asyncio.wait_for(task, max(0.0, remaining))
+        finally:
+            sent.cancel()
+            task.cancel()
+
+    async def analyze(self, call: Callable[[str, Dict], Awaitable[Tuple[Optional[Dict], str]]],
+                      spend: Optional[Callable[[], bool]] = None) -> Tuple[Optional[Dict], str, str]:
+        """
+        按回退链完成一次分析
+
+        Args:
+            call: call(model, timing) 返回 (analysis_data, raw_content)，即 AsyncOpenRouterClient.analyze；
+                  调用方在请求发出时置位 timing['sent'] 并写入 sent_at，给出结果后写入 latency（秒）
+            spend: 发出额外请求（对冲 / 回退）前调用，返回 False 时不再发出
+
+        Returns:
+            (analysis_data, raw_content, model)；全部失败时返回最后一个失败结果
+        """
+        running = {}  # task -> (route, timing, kind)
+        remaining = list(self.routes)
+        last_failure = (None, "No model available", self.routes[0].name)
+        hedging = True
+
+        def launch(kind):
+            route = remaining.pop(0)
+            timing = {'sent': asyncio.Event()}
+            task = asyncio.ensure_future(self._call_route(call, route, timing))
+            running[task] = (route, timing, kind)
+            self.stats['calls'] += 1
+            if kind != 'primary':
+                self.stats[kind + 's'] += 1
+                print(f"[ModelRouter] {kind.capitalize()} request to {route.name}")
+
+        launch('primary')
+        try:
+            while running:
+                delay = None
+                waiters = set(running)
+                sent_waiter = None
+                if remaining and hedging:
+                    newest_route, timing, _ = list(running.values())[-1]
+                    learned = self.hedge_delay(newest_route.name)
+                    if learned is not None:
+                        if timing['sent'].is_set():
+                            delay = max(0.0, timing['sent_at'] + learned - time.perf_counter())
+                        else:
+                            # Still queued in the client: the hedge clock starts once it is sent
+                            sent_waiter = asyncio.ensure_future(timing['sent'].wait())
+                            waiters.add(sent_waiter)
+                done, _ = await asyncio.wait(waiters, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if sent_waiter is not None:
+                    sent_waiter.cancel()
+                    done.discard(sent_waiter)
+                if not done:
+                    if delay is not None:
+                        # The newest request is slower than its usual tail: race the next model against it
+                        if spend is None or spend():
+                            launch('hedge')
+                        else:
+                            hedging = False
+                    continue
+
+                for task in done:
+                    route, timing, kind = running.pop(task)
+                    try:
+                        analysis_data, raw = task.result()
+                    except asyncio.TimeoutError:
+                        self.stats['timeouts'] += 1
+                        analysis_data, raw = None, f"Timeout: {route.name} did not answer within {route.timeout:g}s"
+                    except Exception as e:
+                        analysis_data, raw = None, f"RequestError: {e}"
+                    if isinstance(analysis_data, dict):
+                        latency = timing.get('latency')
+                        if latency is None:
+                            latency = time.perf_counter() - timing.get('sent_at', time.perf_counter())
+                        self.history.observe(route.name, latency)
+                        self.stats['wins'][route.name] = self.stats['wins'].get(route.name, 0) + 1
+                        if kind == 'hedge':
+                            self.stats['hedge_wins'] += 1
+                        return analysis_data, raw, route.name
+                    last_failure = (analysis_data, raw, route.name)
+
+                if not running and remaining:
+                    if spend is None or spend():
+                        print(f"[ModelRouter] {last_failure[2]} failed: {str(last_failure[1])[:200]}")
+                        launch('fallback')
+            return last_failure
+        finally:
+            # First answer wins: cancel the requests still in flight
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def summary(self) -> Dict:
+        return {
+            **self.stats,
+            'chain': [
+                {'model': route.name, 'timeout_s': route.timeout, 'samples': self.history.count(route.name),
+                 'hedge_after_s': self.hedge_delay(route.name)}
+                for route in self.routes
+            ],
+        }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多模式字符串匹配 - Aho-Corasick 自动机
+
+设计说明：
+- 所有关键词一次性编译成一个自动机，对文本只扫描一遍即可得到全部命中的关键词
+- 逐字符转移，中英文关键词统一处理（不依赖分词）
+- 匹配语义与 `keyword in text` 完全一致（子串匹配），大小写由调用方统一处理
+- 状态转移按需缓存（惰性 DFA），热点路径每个字符只需一次字典查找
+- 安装了 pyahocorasick（C 实现）时优先使用，否则使用纯 Python 实现
+"""
+
+from collections import deque
+from typing import FrozenSet, Iterable, List, Optional, Set
+
+try:
+    import ahocorasick  # pyahocorasick, optional C implementation
+except ImportError:
+    ahocorasick = None
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick 多模式匹配器"""
+
+    def __init__(self, patterns: Iterable[str], use_native: bool = True):
+        self.patterns = sorted({p for p in patterns if p})
+        self._native = None
+        if use_native and ahocorasick is not None:
+            self._native = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self._native.add_word(pattern, pattern)
+            if self.patterns:
+                self._native.make_automaton()
+            return
+
+        self._goto: List[dict] = [{}]
+        outputs: List[Set[str]] = [set()]
+
+        # 1. 构建关键词前缀树
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    self._goto.append({})
+                    outputs.append(set())
+                    nxt = len(self._goto) - 1
+                    self._goto[state][ch] = nxt
+                state = nxt
+            outputs[state].add(pattern)
+
+        # 2. 广度优先计算失败指针，并合并后缀状态的输出
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                outputs[nxt] |= outputs[self._fail[nxt]]
+
+        self._outputs: List[Optional[FrozenSet[str]]] = [frozenset(o) if o else None for o in outputs]
+        # 惰性 DFA：缓存 (状态, 字符) -> 下一状态
+        self._delta: List[dict] = [dict() for _ in self._goto]
+
+    def _transition(self, state: int, ch: str) -> int:
+        origin = state
+        while state and ch not in self._goto[state]:
+            state = self._fail[state]
+        nxt = self._goto[state].get(ch, 0)
+        self._delta[origin][ch] = nxt
+        return nxt
+
+    def find(self, text: str) -> Set[str]:
+        """返回 text 中出现过的所有关键词"""
+        if self._native is not None:
+            if not self.patterns:
+                return set()
+            return {pattern for _, pattern in self._native.iter(text)}
+
+        found = set()
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            nxt = delta[state].get(ch)
+            if nxt is None:
+                nxt = self._transition(state, ch)
+            state = nxt
+            matched = outputs[state]
+            if matched is not None:
+                found |= matched
+        return found
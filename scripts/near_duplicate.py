@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复检测 - SimHash 指纹 + 滑动时间窗口索引
+
+设计说明：
+- 转载稿、通稿会以不同 URL 出现在多个订阅源，processed_links 拦不住
+- 对抽取清洗后的正文计算 64 位 SimHash：英文按词、中文按字切分，取连续 3 个词元作为特征
+- 汉明距离不超过 max_distance 视为重复；指纹切成 max_distance + 1 段，
+  由抽屉原理，重复的指纹至少有一段完全相同，按段建倒排表，只对候选计算距离
+- 索引持久化到 CACHE_DIR，只保留最近 window_days 天的指纹
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 20  # 特征太少的文本指纹不可靠，不参与检测
+MAX_FINGERPRINT_CHARS = 20000  # 只用正文开头计算指纹，转载稿的差异主要在尾部
+TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]')
+
+
+def simhash(text: str) -> Optional[int]:
+    """计算 64 位 SimHash；特征不足时返回 None"""
+    tokens = TOKEN_RE.findall(text[:MAX_FINGERPRINT_CHARS].lower())
+    shingles = {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    bit_strings = [
+        format(int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for s in shingles
+    ]
+    # Column-wise bit counts: zip(*) transposes the strings in C instead of looping per bit
+    half = len(bit_strings) / 2
+    bits = ''.join('1' if column.count('1') > half else '0' for column in zip(*bit_strings))
+    return int(bits, 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class FingerprintIndex:
+    """持久化的近似重复指纹索引（线程安全）"""
+
+    def __init__(self, path: str, max_distance: int = 6, window_days: float = 14):
+        """
+        Args:
+            path: 索引文件路径（JSON）
+            max_distance: 判定为重复的最大汉明距离
+            window_days: 指纹保留天数，超出窗口的在加载和保存时丢弃
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.window_seconds = window_days * 86400
+        self.bands = max_distance + 1
+        self._band_width = FINGERPRINT_BITS // self.bands
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        self._buckets: Dict[tuple, List[int]] = {}
+        for entry in self._load():
+            self._insert(entry)
+
+    def _load(self) -> List[Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        cutoff = time.time() - self.window_seconds
+        return [e for e in entries if isinstance(e, dict) and e.get('ts', 0) >= cutoff and 'fp' in e]
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self._band_width) - 1
+        for band in range(self.bands):
+            yield band, (fingerprint >> (band * self._band_width)) & mask
+
+    def _insert(self, entry: Dict):
+        fingerprint = int(entry['fp'], 16)
+        position = len(self._entries)
+        self._entries.append(entry)
+        for key in self._band_keys(fingerprint):
+            self._buckets.setdefault(key, []).append(position)
+
+    def find(self, fingerprint: int, exclude_link: str = '') -> Optional[Dict]:
+        """
+        查找近似重复的已知文章
+
+        Returns:
+            Optional[Dict]: {'link', 'title', 'source', 'ts', 'distance'}，没有重复时返回 None
+        """
+        with self._lock:
+            best = None
+            seen = set()
+            for key in self._band_keys(fingerprint):
+                for position in self._buckets.get(key, ()):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    entry = self._entries[position]
+                    if entry.get('link') == exclude_link:
+                        continue
+                    distance = hamming_distance(fingerprint, int(entry['fp'], 16))
+                    if distance <= self.max_distance and (best is None or distance < best['distance']):
+                        best = dict(entry, distance=distance)
+            return best
+
+    def add(self, fingerprint: int, link: str, title: str = '', source: str = ''):
+        with self._lock:
+            self._insert({
+                'fp': f"{fingerprint:016x}",
+                'link': link,
+                'title': title,
+                'source': source,
+                'ts': time.time(),
+            })
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self):
+        """丢弃窗口外的指纹后原子写回"""
+        with self._lock:
+            cutoff = time.time() - self.window_seconds
+            entries = [e for e in self._entries if e['ts'] >= cutoff]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
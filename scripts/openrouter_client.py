@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步 OpenRouter 客户端 - 并发上限 + 令牌桶限流
+
+设计说明：
+- 基于 asyncio：HTTP 请求在线程中通过共享的 HttpClient 发出，事件循环只负责调度
+- Semaphore 控制同时在途的请求数
+- 两个令牌桶分别限制每分钟请求数（RPM）和每分钟 token 数（TPM），替代固定 sleep
+- 保留原有的两次尝试策略：先带 response_format=json_object，失败后去掉再试一次
+- 可选 SSE 流式回复：边接收边检查 JSON，根对象闭合即停止读取，明显不是所需对象时提前中止；记录每个模型的首 token 时间
+- analyze() 被取消时（对冲请求输掉），流式回复在下一个事件处关闭连接
+- 回复中的 JSON 用单遍、识别字符串的扫描提取，并顺带修复尾逗号、弯引号和被截断的结尾，减少第二次尝试
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+from http_client import HttpClient
+from metrics import percentile
+from model_registry import estimate_tokens
+
+
+# Characters the JSON scanner stops at; everything between them is copied in bulk
+_JSON_SCAN_TOKENS = re.compile(r'[{}\[\]",\\\u201c\u201d\u201e]')
+_SMART_QUOTES = '\u201c\u201d\u201e'  # “ ” „ used by some models as JSON quotes
+_CLOSERS = {'{': '}', '[': ']'}
+
+# Streaming: content allowed before the root object has to start, and the size of each socket read
+STREAM_PREFIX_LIMIT = 400
+STREAM_READ_SIZE = 64
+
+
+def _close_brackets(stack):
+    return ''.join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def scan_json_objects(text):
+    """
+    Single pass over the text yielding repaired candidates for each top-level {...} block, in order.
+
+    - String-aware: braces and commas inside JSON strings are ignored
+    - Trailing commas before } or ] are dropped
+    - Smart quotes used as string delimiters become plain quotes (inside a plain-quoted string they are content)
+    - A truncated final object is closed: the open string and brackets are closed, and if that does not
+      parse, the object is cut back to the last complete member before the truncation point
+    - When a block does not parse as a whole, its directly nested objects are yielded next
+    Each character is visited once, so long outputs with stray braces no longer trigger rescans.
+    """
+    pos = 0
+    length = len(text)
+    while True:
+        start = text.find('{', pos)
+        if start == -1:
+            return
+        out = ['{']
+        stack = ['{']
+        children = []  # (start, end) indexes into out of objects nested directly in the root
+        child_start = None
+        safe_points = []  # (len(out), stack) just before each comma: a cut point if the text is truncated
+        in_string = False
+        string_quote = None
+        pending_comma = False
+        pos = start + 1
+        while stack:
+            match = _JSON_SCAN_TOKENS.search(text, pos)
+            gap_end = match.start() if match else length
+            gap = text[pos:gap_end]
+            if pending_comma and gap.strip():
+                out.append(',')
+                pending_comma = False
+            if gap:
+                out.append(gap)
+            if match is None:
+                break
+            char = match.group()
+            pos = gap_end + 1
+
+            if in_string:
+                if char == '\\':
+                    out.append(text[gap_end:gap_end + 2])
+                    pos = gap_end + 2
+                elif char == '"' or (string_quote != '"' and char in _SMART_QUOTES):
+                    # A plain-quoted string ends at a plain quote; a smart-quoted one at any quote
+                    out.append('"')
+                    in_string = False
+                else:
+                    out.append(char)
+                continue
+
+            if char == ',':
+                if pending_comma:
+                    continue  # Collapse ",," into one
+                safe_points.append((len(out), tuple(stack)))
+                pending_comma = True
+                continue
+            if char in '}]':
+                pending_comma = False  # Trailing comma
+                if _CLOSERS[stack[-1]] != char:
+                    break  # Mismatched bracket: give up on this block
+                stack.pop()
+                out.append(char)
+                if len(stack) == 1 and child_start is not None and char == '}':
+                    children.append((child_start, len(out)))
+                    child_start = None
+                continue
+            if pending_comma:
+                out.append(',')
+                pending_comma = False
+            if char in '{[':
+                if len(stack) == 1 and char == '{':
+                    child_start = len(out)
+                stack.append(char)
+                out.append(char)
+            else:
+                # Opening quote: plain or smart
+                in_string = True
+                string_quote = char
+                out.append('"')
+
+        if not stack:
+            yield ''.join(out)
+        elif match is None:
+            # Truncated: close what is open, then fall back to the last complete member
+            tail = '"' if in_string else ''
+            yield ''.join(out) + tail + _close_brackets(stack)
+            if safe_points:
+                cut, cut_stack = safe_points[-1]
+                yield ''.join(out[:cut]) + _close_brackets(cut_stack)
+        for child_begin, child_end in children:
+            yield ''.join(out[child_begin:child_end])
+        if match is None:
+            return
+
+
+def parse_json_safely(text):
+    """
+    Compatible with the following returns:
+    - Pure JSON
+    - ```json ... ``` or ``` ... ``` wrapped
+    - Leading/trailing prompts/blank lines/spaces
+    - Multiple text segments containing one or more {...} JSON blocks (take the first complete block)
+    - Common model mistakes: trailing commas, smart quotes, raw newlines in strings, truncated final object
+    """
+    # 1) Direct attempt
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+
+    # 2) Remove ```json ... ``` / ``` ... ``` code fences
+    fenced = re.search(r"```(?:json)?\s*(.+?)\s*```", text, flags=re.DOTALL | re.IGNORECASE)
+    if fenced:
+        inner = fenced.group(1).strip()
+        try:
+            return json.loads(inner)
+        except Exception:
+            text = inner  # Continue with subsequent steps
+
+    # 3) Extract the first complete brace JSON block from the full text
+    #    Single string-aware pass that also repairs the block (see scan_json_objects)
+    for candidate in scan_json_objects(text):
+        try:
+            parsed = json.loads(candidate, strict=False)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+
+    # 4) If all else fails, throw error and let upper layer record original text
+    raise json.JSONDecodeError("No valid JSON object found", text, 0)
+
+
+def estimate_request_tokens(payload: Dict) -> int:
+    """粗略估算一次请求消耗的 token：输入按本地估算（CJK 1 字/token，其余 4 字符/token），加上 max_tokens"""
+    prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in payload.get('messages', []))
+    return prompt_tokens + int(payload.get('max_tokens', 0))
+
+
+class TokenBucket:
+    """异步令牌桶：rate_per_minute <= 0 表示不限流"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        if self.rate <= 0:
+            return
+        # A single request larger than the bucket may still go through once the bucket is full
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def _sse_lines(resp: requests.Response):
+    """逐行读取 SSE 回复（SSE 固定为 UTF-8；小块读取，没有分块传输编码时事件也能按到达顺序交付）"""
+    buffer = b''
+    for chunk in resp.iter_content(chunk_size=STREAM_READ_SIZE):
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8', errors='replace')
+    if buffer:
+        yield buffer.decode('utf-8', errors='replace')
+
+
+class StreamingJSONMonitor:
+    """
+    增量跟踪流式回复中的 JSON 对象（识别字符串，与 scan_json_objects 使用相同的引号规则）
+
+    feed() 返回 None 表示继续读取，'complete' 表示根对象已闭合（可以停止读取），其他字符串为中止原因
+    """
+
+    def __init__(self, prefix_limit: int = STREAM_PREFIX_LIMIT):
+        """
+        Args:
+            prefix_limit: 根对象开始前允许出现的最多字符数（代码块标记、说明文字）
+        """
+        self.prefix_limit = prefix_limit
+        self.seen = 0
+        self.depth = 0
+        self.in_string = False
+        self.string_quote = None
+        self.escape = False
+        self.expect_key = False  # Right after the root '{': the first member must start with a quote
+
+    def feed(self, chunk: str) -> Optional[str]:
+        for char in chunk:
+            self.seen += 1
+            if self.depth == 0:
+                if char == '{':
+                    self.depth = 1
+                    self.expect_key = True
+                elif self.seen > self.prefix_limit:
+                    return f"no JSON object in the first {self.prefix_limit} characters"
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"' or (self.string_quote != '"' and char in _SMART_QUOTES):
+                    self.in_string = False
+                continue
+            if self.expect_key and not char.isspace():
+                self.expect_key = False
+                if char not in '"}' + _SMART_QUOTES:
+                    return f"root object does not start with a quoted key (got {char!r})"
+            if char == '"' or char in _SMART_QUOTES:
+                self.in_string = True
+                self.string_quote = char
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    return 'complete'
+        return None
+
+
+class AsyncOpenRouterClient:
+    """异步 OpenRouter 分析客户端"""
+
+    def __init__(self, http_client: HttpClient, api_key: str, url: str,
+                 max_concurrency: int = 4, requests_per_minute: float = 20,
+                 tokens_per_minute: float = 0, stream: bool = False,
+                 first_token_timeout: float = 30, stream_idle_timeout: float = 15):
+        """
+        Args:
+            http_client: 共享HTTP客户端（连接池大小应不小于 max_concurrency）
+            api_key: OpenRouter API key
+            url: chat/completions 接口地址
+            max_concurrency: 同时在途的最大请求数
+            requests_per_minute: 每分钟请求数上限（<= 0 不限）
+            tokens_per_minute: 每分钟 token 数上限（<= 0 不限）
+            stream: 使用 SSE 流式回复（增量检查 JSON，可提前中止）
+            first_token_timeout: 流式模式下等待第一个 token 的最长时间（秒）
+            stream_idle_timeout: 流式模式下两次数据到达之间的最长间隔（秒，即读取超时）
+        """
+        self.http_client = http_client
+        self.api_key = api_key
+        self.url = url
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.stream = stream
+        self.first_token_timeout = first_token_timeout
+        self.stream_idle_timeout = stream_idle_timeout
+        self.stream_stats = {'streams': 0, 'ended_early': 0, 'aborted': 0, 'first_token_timeouts': 0}
+        self.first_token_seconds: Dict[str, List[float]] = {}  # model -> time to first token per call
+        self._stats_lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._request_bucket = None
+        self._token_bucket = None
+
+    def _ensure_primitives(self):
+        # asyncio primitives are bound to the event loop they are used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._request_bucket = TokenBucket(self.requests_per_minute)
+            self._token_bucket = TokenBucket(self.tokens_per_minute)
+
+    async def _post(self, data: Dict) -> requests.Response:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        if not data.get('stream'):
+            return await asyncio.to_thread(self.http_client.post, self.url, headers=headers, json=data)
+        # Streaming: the read timeout bounds the gap between events instead of the whole response.
+        # Until the first token it must not be shorter than the first-token deadline (tightened in _read_stream)
+        timeout = (self.http_client.timeout[0], max(self.first_token_timeout, self.stream_idle_timeout))
+        return await asyncio.to_thread(self.http_client.post, self.url, headers=headers, json=data,
+                                       stream=True, timeout=timeout)
+
+    def _count_stream(self, key: str):
+        with self._stats_lock:
+            self.stream_stats[key] += 1
+
+    @staticmethod
+    def _set_read_timeout(resp: requests.Response, seconds: float):
+        """调整已建立连接的读取超时（拿不到底层 socket 时保持原值）"""
+        sock = getattr(getattr(resp.raw, 'connection', None), 'sock', None)
+        if sock is not None:
+            sock.settimeout(seconds)
+
+    def _read_stream(self, resp: requests.Response, model: str, started: float,
+                     abort: Optional[threading.Event] = None) -> Tuple[Optional[str], str]:
+        """
+        读取 SSE 回复并拼接 delta 内容（在线程中运行；abort 被设置时关闭连接并停止读取）
+
+        首 token 之前读取超时为 max(first_token_timeout, stream_idle_timeout)，服务端完全无响应时
+        计为首 token 超时；收到首 token 后收紧为 stream_idle_timeout
+
+        Returns:
+            (content, error)；中止或出错时 content 为 None
+        """
+        self._count_stream('streams')
+        monitor = StreamingJSONMonitor()
+        parts = []
+        first_token = False
+        try:
+            for line in _sse_lines(resp):
+                if abort is not None and abort.is_set():
+                    return None, "Cancelled"
+                if not first_token and time.perf_counter() - started > self.first_token_timeout:
+                    self._count_stream('first_token_timeouts')
+                    return None, f"StreamTimeout: no token within {self.first_token_timeout:g}s"
+                if not line.startswith('data:'):
+                    continue  # Blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                if event.get('error'):
+                    return None, f"API Error: {event['error']}"
+                choices = event.get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content') or ''
+                if not delta:
+                    continue
+                if not first_token:
+                    first_token = True
+                    with self._stats_lock:
+                        self.first_token_seconds.setdefault(model, []).append(time.perf_counter() - started)
+                    self._set_read_timeout(resp, self.stream_idle_timeout)
+                parts.append(delta)
+                verdict = monitor.feed(delta)
+                if verdict == 'complete':
+                    # The object is closed: skip whatever the model writes after it
+                    self._count_stream('ended_early')
+                    break
+                if verdict is not None:
+                    self._count_stream('aborted')
+                    return None, f"StreamAborted: {verdict}; content: {''.join(parts)[:500]}"
+        except (requests.Timeout, requests.ConnectionError) as e:
+            read_timeout = isinstance(e, requests.Timeout) or any(isinstance(arg, ReadTimeoutError) for arg in e.args)
+            if read_timeout and not first_token:
+                self._count_stream('first_token_timeouts')
+                return None, f"StreamTimeout: no token within {self.first_token_timeout:g}s"
+            raise
+        finally:
+            resp.close()
+        return ''.join(parts), ''
+
+    def first_token_summary(self) -> Dict[str, Dict[str, float]]:
+        """每个模型的首 token 时间（毫秒）"""
+        with self._stats_lock:
+            samples = {model: sorted(values) for model, values in self.first_token_seconds.items()}
+        return {
+            model: {
+                'count': len(values),
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p90_ms': percentile(values, 0.90) * 1000,
+                'max_ms': values[-1] * 1000,
+            }
+            for model, values in samples.items()
+        }
+
+    async def analyze(self, base_payload: Dict, timing: Optional[Dict] = None) -> Tuple[Optional[Dict], str]:
+        """
+        发送分析请求并解析 JSON 结果
+
+        Args:
+            base_payload: 请求体（不含 response_format / stream）
+            timing: 可选的计时字典：第一次发出请求时写入 sent_at（perf_counter）并置位其中的 'sent'
+                    （asyncio.Event，若有）；给出结果时写入 latency，即该次请求从发出到收到回复的秒数
+                    （不含排队、限流等待和被放弃的第一次尝试）
+
+        Returns:
+            (analysis_data, raw_content)；失败时 analysis_data 为 None，第二项为错误说明
+        """
+        self._ensure_primitives()
+        abort = threading.Event()
+        try:
+            async with self._semaphore:
+                return await self._analyze(base_payload, abort, timing)
+        except asyncio.CancelledError:
+            # A streamed reply stops at the next event; a plain request finishes in its worker thread
+            abort.set()
+            raise
+
+    async def _analyze(self, base_payload: Dict, abort: Optional[threading.Event] = None,
+                       timing: Optional[Dict] = None) -> Tuple[Optional[Dict], str]:
+        # Attempt 1: with response_format (more likely to get pure JSON)
+        for attempt in (1, 2):
+            data = dict(base_payload)  # Shallow copy
+            if attempt == 1:
+                data["response_format"] = {"type": "json_object"}
+                print("[OpenRouter] Attempting to use response_format=json_object")
+            else:
+                print("[OpenRouter] Fallback retry without response_format")
+            if self.stream:
+                data["stream"] = True
+
+            resp = None
+            try:
+                await self._request_bucket.acquire(1)
+                await self._token_bucket.acquire(estimate_request_tokens(data))
+                started = time.perf_counter()
+                if timing is not None and 'sent_at' not in timing:
+                    timing['sent_at'] = started
+                    if timing.get('sent') is not None:
+                        timing['sent'].set()
+                resp = await self._post(data)
+                status = resp.status_code
+                print(f"[OpenRouter] HTTP {status}")
+                if status >= 400:
+                    print(f"[OpenRouter] Body: {resp.text[:1000]}")
+                    # Some models will return 400 for response_format, proceed to next fallback attempt
+                    if attempt == 1:
+                        continue
+                    resp.raise_for_status()
+
+                if self.stream and resp.headers.get('Content-Type', '').startswith('text/event-stream'):
+                    content, error = await asyncio.to_thread(self._read_stream, resp, data.get('model', ''), started, abort)
+                    if content is None:
+                        # Aborted before paying for the rest of the generation
+                        if attempt == 1:
+                            print(f"[OpenRouter] {error}; will retry without response_format")
+                            continue
+                        return None, error
+                    if not content:
+                        if attempt == 1:
+                            print(f"[OpenRouter] Empty streamed content, will retry without response_format")
+                            continue
+                        return None, f"Invalid choice structure: missing message or content"
+                else:
+                    # Parse response
+                    api_response = resp.json()
+
+                    # Check if response is valid format
+                    if not isinstance(api_response, dict):
+                        if attempt == 1:
+                            print(f"[OpenRouter] Invalid response format (not dict), will retry without response_format. Type: {type(api_response)}")
+                            continue
+                        return None, f"Invalid response format: expected dict, got {type(api_response)}"
+
+                    if api_response.get("error"):
+                        # If it's a clear API error and attempt 1, do fallback retry
+                        if attempt == 1:
+                            print(f"[OpenRouter] API Error on attempt 1, will retry without response_format: {api_response['error']}")
+                            continue
+                        return None, f"API Error: {api_response['error']}"
+
+                    # Check if choices exist and have expected structure
+                    if not api_response.get('choices') or not isinstance(api_response['choices'], list) or len(api_response['choices']) == 0:
+                        if attempt == 1:
+                            print(f"[OpenRouter] Missing or invalid choices in response, will retry without response_format")
+                            continue
+                        return None, f"Invalid response structure: missing or empty choices"
+
+                    choice = api_response['choices'][0]
+                    if not isinstance(choice, dict) or not choice.get('message') or not choice['message'].get('content'):
+                        if attempt == 1:
+                            print(f"[OpenRouter] Invalid choice structure, will retry without response_format")
+                            continue
+                        return None, f"Invalid choice structure: missing message or content"
+
+                    content = choice['message']['content']
+
+                try:
+                    analysis_data = parse_json_safely(content)
+                    if timing is not None:
+                        timing['latency'] = time.perf_counter() - started
+                    return analysis_data, content
+                except json.JSONDecodeError as e:
+                    # Attempt 1 failed, fallback; if attempt 2 still fails, return error
+                    if attempt == 1:
+                        print(f"[Parse failed@attempt1] {e}; will fallback retry. First 500 chars: {content[:500]}")
+                        continue
+                    return None, f"JSONDecodeError(after fallback): {e}; content: {content[:1000]}"
+
+            except requests.HTTPError:
+                if attempt == 1:
+                    continue
+                return None, f"HTTPError: {resp.status_code}; body: {resp.text[:1000]}"
+            except Exception as e:
+                if attempt == 1:
+                    continue
+                return None, f"RequestError: {e}"
+
+        # Should theoretically never reach here
+        return None, "Unknown error"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+data.json 写入器 - 一次读取、一次原子写入
+
+设计说明：
+- 启动时读取一次已发布的数组（同时用于计算下一个 ID），运行结束时在内存中追加新条目并裁剪到最近 N 条
+- 序列化后先校验（能解析回 JSON 数组、条数一致、每条都有 id），校验不通过不替换已发布文件
+- 写入同目录临时文件并 fsync，再 os.replace 原子替换：任何时刻崩溃，data.json 要么是旧版本要么是新版本
+- 已发布文件损坏时备份为 .corrupt 后从空数组开始，不在损坏文件上继续打补丁
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, List
+
+
+class OutputValidationError(Exception):
+    """序列化结果未通过校验"""
+
+
+def atomic_write(path: str, payload: bytes):
+    """写同目录临时文件 + fsync + os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def validate_records(payload: bytes, expected_count: int):
+    """序列化结果必须能解析回数组，条数一致，且每条都有 id"""
+    try:
+        parsed = json.loads(payload.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise OutputValidationError(f"serialized output does not parse: {e}")
+    if not isinstance(parsed, list) or len(parsed) != expected_count:
+        raise OutputValidationError("serialized output is not the expected array")
+    if any(not isinstance(item, dict) or 'id' not in item for item in parsed):
+        raise OutputValidationError("every record needs an id")
+
+
+class OutputWriter:
+    """data.json 的读取与原子写入"""
+
+    def __init__(self, path: str, max_items: int = 100):
+        """
+        Args:
+            path: 输出文件路径
+            max_items: 保留的最近条目数
+        """
+        self.path = path
+        self.max_items = max_items
+        self.items: List[Dict] = []
+
+    def load(self) -> List[Dict]:
+        """读取已发布的数组；文件不存在或为空时创建空数组"""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            self._replace(b'[]')
+            self.items = []
+            return self.items
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, list):
+                raise ValueError("top-level value is not an array")
+            self.items = data
+        except (ValueError, UnicodeDecodeError) as e:
+            backup = f"{self.path}.corrupt"
+            shutil.copyfile(self.path, backup)
+            print(f"Warning: {self.path} is not a valid JSON array ({e}); backed up to {backup}, starting from an empty list.")
+            self.items = []
+        return self.items
+
+    def next_id(self) -> int:
+        try:
+            return self.items[-1]['id'] + 1 if self.items else 1
+        except (KeyError, TypeError):
+            return 1
+
+    def write(self, new_items: List[Dict]) -> List[Dict]:
+        """追加并裁剪，校验后原子替换已发布文件；返回写入的全部条目"""
+        combined = self.items + list(new_items)
+        if self.max_items and len(combined) > self.max_items:
+            combined = combined[-self.max_items:]
+        payload = json.dumps(combined, indent=2, ensure_ascii=False).encode('utf-8')
+        validate_records(payload, len(combined))
+        self._replace(payload)
+        self.items = combined
+        return combined
+
+    def _replace(self, payload: bytes):
+        atomic_write(self.path, payload)
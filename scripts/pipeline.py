@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stage 2 流水线工具 - 抓取/抽取 → 分析 → 打标签 分阶段并行
+
+设计说明：
+- round_robin 复现原有的轮询顺序：每处理一个条目指针前进一位，空桶出环
+  （该顺序只取决于候选桶本身，与处理结果无关，因此可以提前预取）
+- Prefetcher 在线程池中按顺序预取后续条目，窗口大小固定（有界队列），结果按提交顺序产出
+- StageWorker 用单个后台线程消费有界队列，让打标签与下一次模型调用重叠；
+  可选地截获该线程的输出，由主线程在合适的时机整段打印，避免与主线程的输出在行内交错
+"""
+
+import io
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+def round_robin(candidates_by_source: Dict[str, List]) -> Iterator[Tuple[str, Any]]:
+    """按来源轮询产出 (source_name, entry)，与原 Stage 2 的取数顺序完全一致"""
+    buckets = {name: list(bucket) for name, bucket in candidates_by_source.items()}
+    source_names = list(buckets.keys())
+    idx = 0
+    while source_names:
+        source_name = source_names[idx % len(source_names)]
+        bucket = buckets[source_name]
+        if not bucket:
+            # Source is empty, remove and don't increment idx (shrink the ring)
+            source_names.remove(source_name)
+            continue
+        yield source_name, bucket.pop(0)
+        idx += 1
+
+
+class Prefetcher:
+    """有界顺序预取器"""
+
+    def __init__(self, items: Iterable, fn: Callable, workers: int = 4, depth: int = 4):
+        """
+        Args:
+            items: 待处理条目（按处理顺序）
+            fn: 在线程池中执行的函数，参数为条目本身（元组会被展开）
+            workers: 线程数
+            depth: 最多提前提交的条目数（含正在执行的）
+        """
+        self._items = iter(items)
+        self._fn = fn
+        self._depth = max(1, depth)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='prefetch')
+        self._window = deque()
+
+    def _fill(self):
+        while len(self._window) < self._depth:
+            try:
+                item = next(self._items)
+            except StopIteration:
+                return
+            args = item if isinstance(item, tuple) else (item,)
+            self._window.append((item, self._executor.submit(self._fn, *args)))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Tuple[Any, Any]:
+        """返回 (item, result)；任务抛出的异常作为 result 返回，由调用方决定如何处理"""
+        self._fill()
+        if not self._window:
+            raise StopIteration
+        item, future = self._window.popleft()
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        self._fill()
+        return item, result
+
+    def close(self):
+        """丢弃尚未开始的预取任务"""
+        for _, future in self._window:
+            future.cancel()
+        self._window.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ThreadOutputCapture(io.TextIOBase):
+    """sys.stdout 代理：登记过的线程写入各自的缓冲，其余线程照常输出"""
+
+    def __init__(self, target):
+        self.target = target
+        self._buffers: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def register(self):
+        with self._lock:
+            self._buffers[threading.get_ident()] = []
+
+    def unregister(self):
+        with self._lock:
+            self._buffers.pop(threading.get_ident(), None)
+
+    def take(self) -> str:
+        """取出当前线程缓冲的输出"""
+        with self._lock:
+            buffer = self._buffers.get(threading.get_ident())
+            if not buffer:
+                return ''
+            text = ''.join(buffer)
+            buffer.clear()
+            return text
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            buffer = self._buffers.get(threading.get_ident())
+            if buffer is not None:
+                buffer.append(text)
+                return len(text)
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+class StageWorker:
+    """单线程后台阶段：有界输入队列，结果按提交顺序收集"""
+
+    _STOP = object()
+
+    def __init__(self, fn: Callable, maxsize: int = 4, name: str = 'stage', capture_output: bool = False):
+        """
+        Args:
+            fn: 在后台线程中执行的函数
+            maxsize: 输入队列长度（背压）
+            name: 线程名
+            capture_output: 截获后台线程的输出，由调用方通过 flush_output() 在自己的线程中打印
+        """
+        self._fn = fn
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self._results = []
+        self._errors = []
+        self._output = queue.Queue()
+        self._capture = None
+        if capture_output:
+            if not isinstance(sys.stdout, ThreadOutputCapture):
+                sys.stdout = ThreadOutputCapture(sys.stdout)
+                self._installed = True
+            else:
+                self._installed = False
+            self._capture = sys.stdout
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if self._capture is not None:
+            self._capture.register()
+        try:
+            while True:
+                args = self._queue.get()
+                if args is self._STOP:
+                    return
+                try:
+                    self._results.append(self._fn(*args))
+                except Exception as e:
+                    self._errors.append(e)
+                    print(f"[Pipeline] Stage '{self._thread.name}' error: {e}")
+                if self._capture is not None:
+                    self._output.put(self._capture.take())
+        finally:
+            if self._capture is not None:
+                self._capture.unregister()
+
+    def submit(self, *args):
+        """队列满时阻塞，形成背压"""
+        self._queue.put(args)
+
+    def flush_output(self):
+        """在调用方线程中打印已完成条目截获的输出（按完成顺序）"""
+        while True:
+            try:
+                text = self._output.get_nowait()
+            except queue.Empty:
+                return
+            if text:
+                sys.stdout.write(text)
+
+    def join(self) -> List:
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.flush_output()
+        if self._capture is not None and self._installed and sys.stdout is self._capture:
+            sys.stdout = self._capture.target
+        return self._results
@@ -0,0 +1,1291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS 分析流水线 - 可导入的分阶段 API
+
+设计说明：
+- 配置集中在 PipelineConfig.from_env()，导入本模块不读取环境变量、不读写文件、不发网络请求
+- RSSPipeline 暴露显式的阶段方法：collect（采集候选）→ extract（抓取/抽取）→ analyze（模型分析）
+  → tag（标签优化）→ publish（写出 data.json / archive），run() 串起完整流程；
+  process() 按原有方式流水线化执行 extract/analyze/tag，预算仍严格按候选顺序检查
+- requests、feedparser、bs4、TagOptimizer 等重依赖在第一次用到的阶段才导入，
+  共享资源（HTTP 客户端、链接库、缓存、索引）也在第一次使用时创建
+- rss_analyzer.py 只是命令行入口：加载 .env、检查 API key、解析参数后调用 run()
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from metrics import RunMetrics
+from model_registry import ModelSpec, content_token_budget, estimate_tokens, get_model_spec, truncate_to_tokens
+
+if TYPE_CHECKING:
+    from stage_profiler import StageProfiler
+
+DEFAULT_MODEL = "mistralai/mistral-small-3.2-24b-instruct:free"
+DEFAULT_OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Bump whenever the prompt template in build_openrouter_payload changes (invalidates cached analyses)
+PROMPT_VERSION = "smart-tags-v1"
+
+# Bump whenever clean_text_lines / optimize_content_length change (re-cleans cached article text)
+CLEAN_VERSION = "clean-v1"
+
+# 噪音过滤关键词
+NOISE_KEYWORDS = ['subscribe', 'newsletter', 'related', 'advert', 'recommend', 'copyright']
+MIN_LINE_LENGTH = 30  # 最小行长度阈值
+
+# Room for the title on top of the prompt template when computing the article token budget
+TITLE_TOKEN_ALLOWANCE = 200
+
+INVALID_LINK_PATTERNS = [re.compile(p) for p in [
+    r'^https?://www\.siriusxm\.com/?$',  # SiriusXM homepage
+    r'^https?://[^/]+/?$',  # Any domain homepage without path
+    r'^https?://[^/]+/?(#.*)?$',  # Domain with only fragment
+    r'^https?://[^/]+/?(\?.*)?$',  # Domain with only query params
+]]
+
+
+@dataclass
+class PipelineConfig:
+    """流水线配置（默认值与环境变量的默认值一致）"""
+    api_key: str = ''
+    model: str = DEFAULT_MODEL
+    openrouter_url: str = DEFAULT_OPENROUTER_URL  # Override for local stand-ins (benchmark)
+
+    # Model parameters for better output quality
+    temperature: float = 0.7          # Creativity vs consistency balance
+    top_p: float = 0.9                # Nucleus sampling
+    top_k: int = 40                   # Top-k sampling
+    max_tokens: int = 2048            # Response length limit
+    context_tokens: int = 0           # Context window override for models missing from the registry (0 = registry)
+    max_content_tokens: int = 50000   # Cap on article tokens per call (cost control, <= 0 disables)
+
+    processed_links_file: str = "scripts/processed_links.idx"
+    legacy_processed_links_file: str = "scripts/processed_links.json"  # Migrated into processed_links_file on first run
+    output_file: str = "data.json"
+    max_output_items: int = 100       # data.json keeps only the most recent records
+    archive_dir: str = "archive"      # Full history: fixed-size shards plus manifest.json
+    archive_shard_size: int = 100     # Records per shard (fixed once the archive exists)
+    source_file: str = "scripts/source.json"
+    cache_dir: str = ".cache"         # Local caches (restored between runs by actions/cache)
+
+    # Output and API call control
+    max_new_items: int = 5            # Maximum successful output items for this run
+    max_api_calls: int = 8            # Maximum model API calls for this run (failures also count)
+    max_per_source: int = 5           # Maximum candidate items sampled per source (candidates only, not final success count)
+    http_timeout: float = 20          # Timeout seconds for web scraping/model calls
+
+    # Model call concurrency and rate limiting (token buckets instead of a fixed sleep)
+    openrouter_max_concurrency: int = 4  # Max in-flight model requests
+    openrouter_rpm: float = 20        # Requests per minute (<= 0 disables)
+    openrouter_tpm: float = 0         # Estimated tokens per minute (<= 0 disables)
+
+    # Streaming (SSE) replies: JSON is checked as tokens arrive, timeouts follow token arrival
+    stream: bool = False
+    first_token_timeout: float = 30   # Max wait for the first token (seconds; also the read timeout until then)
+    stream_idle_timeout: float = 15   # Max gap between streamed events once tokens flow (seconds)
+
+    # Ordered model fallback chain ("model@seconds, model", tried after `model`) and hedged requests
+    fallback_models: str = ''
+    model_timeout: float = 60         # Per-model deadline for one call, unless set with @seconds
+    hedge_quantile: float = 0.9       # Hedge to the next model past this latency percentile (<= 0 disables)
+    hedge_min_samples: int = 5        # Latency samples a model needs before it is hedged
+
+    # Analysis result cache (hits skip the model call and don't count against max_api_calls)
+    analysis_cache_enabled: bool = True
+    analysis_cache_max_mb: float = 50  # Size cap, LRU eviction beyond it
+
+    # Article content cache: compressed page HTML plus extracted/cleaned text per URL (hits skip download and parsing)
+    content_cache_enabled: bool = True
+    content_cache_max_mb: float = 200  # Size cap (compressed), LRU eviction beyond it
+    content_cache_ttl_hours: float = 72  # Entries older than this are fetched again (<= 0 = never expire)
+
+    # Near-duplicate detection (syndicated copies under different URLs are skipped before the model call)
+    near_dup_enabled: bool = True
+    near_dup_max_distance: int = 6    # Max SimHash Hamming distance (of 64 bits)
+    near_dup_window_days: float = 14  # Fingerprints older than this are forgotten
+
+    # Shared HTTP client (connection pooling / keep-alive for feeds, articles and OpenRouter)
+    http_pool_connections: int = 32   # Number of per-host pools kept alive
+    http_pool_maxsize: int = 16       # Max keep-alive connections per host
+    http_connect_timeout: float = 5   # Connect timeout for articles/model calls
+    http_user_agent: str = ''         # Empty = http_client.DEFAULT_USER_AGENT
+
+    # Feed collection (Stage 1) concurrency and timeouts
+    feed_workers: int = 16            # Parallel feed downloads (1 = serial)
+    feed_connect_timeout: float = 5   # Per-feed connect timeout (seconds)
+    feed_read_timeout: float = 15     # Per-feed read timeout (seconds)
+    feed_deadline: float = 120        # Global deadline for the whole Stage 1 (seconds)
+    feed_conditional_get: bool = True  # Send ETag/Last-Modified and skip unchanged feeds
+
+    # Stage 2 source order: weighted by expected yield per cost from previous runs (off = plain round-robin)
+    source_scheduler_enabled: bool = True
+    source_min_share: float = 0.3     # Guaranteed share per source, relative to an equal share (1 = equal turns)
+    source_stats_decay: float = 0.8   # Weight of older runs in the per-source statistics
+
+    # Stage 2 pipeline (prefetch candidates while the model is busy)
+    pipeline_workers: int = 4         # Threads fetching/extracting upcoming candidates
+    pipeline_depth: int = 4           # Max candidates prefetched ahead / queued for tagging
+
+    # Article downloads are streamed and stop at this many bytes (text past the token budget is discarded anyway)
+    article_max_bytes: int = 2048 * 1024
+
+    # HTML parser backend for extraction: auto (fastest installed), lxml, html5lib or html.parser
+    html_parser: str = 'auto'
+
+    # Local extractive pre-summarization: long articles are reduced to their most informative sentences
+    presummarize_enabled: bool = False
+    presummarize_tokens: int = 3000   # Target token budget for the extract
+
+    # Run report: per-stage timings, counts, bytes and error classes per source (next to output_file when empty)
+    run_report_file: str = ''
+    run_report_prometheus: bool = False  # Also write <report>.prom (textfile collector)
+
+    @classmethod
+    def from_env(cls, environ=None) -> 'PipelineConfig':
+        """从环境变量读取配置（未设置的项使用默认值）"""
+        env = os.environ if environ is None else environ
+        return cls(
+            api_key=env.get("OPENROUTER_API_KEY") or '',
+            model=env.get("OPENROUTER_MODEL") or DEFAULT_MODEL,  # Model name fallback (don't use || concatenation in YAML)
+            openrouter_url=env.get("OPENROUTER_URL") or DEFAULT_OPENROUTER_URL,
+            temperature=float(env.get("OPENROUTER_TEMPERATURE", "0.7")),
+            top_p=float(env.get("OPENROUTER_TOP_P", "0.9")),
+            top_k=int(env.get("OPENROUTER_TOP_K", "40")),
+            max_tokens=int(env.get("OPENROUTER_MAX_TOKENS", "2048")),
+            context_tokens=int(env.get("OPENROUTER_CONTEXT_TOKENS") or 0),
+            max_content_tokens=int(env.get("MAX_CONTENT_TOKENS", "50000")),
+            archive_shard_size=int(env.get("ARCHIVE_SHARD_SIZE", "100")),
+            cache_dir=env.get("CACHE_DIR", ".cache"),
+            max_new_items=int(env.get("MAX_NEW_ITEMS", "5")),
+            max_api_calls=int(env.get("MAX_API_CALLS", "8")),
+            max_per_source=int(env.get("MAX_PER_SOURCE", "5")),
+            openrouter_max_concurrency=int(env.get("OPENROUTER_MAX_CONCURRENCY", "4")),
+            openrouter_rpm=float(env.get("OPENROUTER_RPM", "20")),
+            openrouter_tpm=float(env.get("OPENROUTER_TPM", "0")),
+            stream=env.get("OPENROUTER_STREAM", "0") == "1",
+            first_token_timeout=float(env.get("OPENROUTER_FIRST_TOKEN_TIMEOUT", "30")),
+            stream_idle_timeout=float(env.get("OPENROUTER_STREAM_IDLE_TIMEOUT", "15")),
+            fallback_models=env.get("OPENROUTER_FALLBACK_MODELS") or '',
+            model_timeout=float(env.get("OPENROUTER_MODEL_TIMEOUT", "60")),
+            hedge_quantile=float(env.get("OPENROUTER_HEDGE_QUANTILE", "0.9")),
+            hedge_min_samples=int(env.get("OPENROUTER_HEDGE_MIN_SAMPLES", "5")),
+            analysis_cache_enabled=env.get("ANALYSIS_CACHE", "1") == "1",
+            analysis_cache_max_mb=float(env.get("ANALYSIS_CACHE_MAX_MB", "50")),
+            content_cache_enabled=env.get("CONTENT_CACHE", "1") == "1",
+            content_cache_max_mb=float(env.get("CONTENT_CACHE_MAX_MB", "200")),
+            content_cache_ttl_hours=float(env.get("CONTENT_CACHE_TTL_HOURS", "72")),
+            near_dup_enabled=env.get("NEAR_DUP", "1") == "1",
+            near_dup_max_distance=int(env.get("NEAR_DUP_MAX_DISTANCE", "6")),
+            near_dup_window_days=float(env.get("NEAR_DUP_WINDOW_DAYS", "14")),
+            http_pool_connections=int(env.get("HTTP_POOL_CONNECTIONS", "32")),
+            http_pool_maxsize=int(env.get("HTTP_POOL_MAXSIZE", "16")),
+            http_connect_timeout=float(env.get("HTTP_CONNECT_TIMEOUT", "5")),
+            http_user_agent=env.get("HTTP_USER_AGENT") or '',
+            feed_workers=int(env.get("FEED_WORKERS", "16")),
+            feed_connect_timeout=float(env.get("FEED_CONNECT_TIMEOUT", "5")),
+            feed_read_timeout=float(env.get("FEED_READ_TIMEOUT", "15")),
+            feed_deadline=float(env.get("FEED_DEADLINE", "120")),
+            feed_conditional_get=env.get("FEED_CONDITIONAL_GET", "1") == "1",
+            source_scheduler_enabled=env.get("SOURCE_SCHEDULER", "1") == "1",
+            source_min_share=float(env.get("SOURCE_MIN_SHARE", "0.3")),
+            source_stats_decay=float(env.get("SOURCE_STATS_DECAY", "0.8")),
+            pipeline_workers=int(env.get("PIPELINE_WORKERS", "4")),
+            pipeline_depth=int(env.get("PIPELINE_DEPTH", "4")),
+            article_max_bytes=int(float(env.get("ARTICLE_MAX_KB", "2048")) * 1024),
+            html_parser=env.get("HTML_PARSER", "auto"),
+            presummarize_enabled=env.get("PRESUMMARIZE", "0") == "1",
+            presummarize_tokens=int(env.get("PRESUMMARIZE_TOKENS", "3000")),
+            run_report_file=env.get("RUN_REPORT_FILE") or '',
+            run_report_prometheus=env.get("RUN_REPORT_PROMETHEUS", "0") == "1",
+        )
+
+    @property
+    def feed_state_file(self) -> str:
+        return os.path.join(self.cache_dir, "feed_state.json")
+
+    @property
+    def analysis_cache_file(self) -> str:
+        return os.path.join(self.cache_dir, "analysis_cache.sqlite")
+
+    @property
+    def content_cache_file(self) -> str:
+        return os.path.join(self.cache_dir, "content_cache.sqlite")
+
+    @property
+    def fingerprint_file(self) -> str:
+        return os.path.join(self.cache_dir, "fingerprints.json")
+
+    @property
+    def source_stats_file(self) -> str:
+        return os.path.join(self.cache_dir, "source_stats.json")
+
+    @property
+    def latency_file(self) -> str:
+        return os.path.join(self.cache_dir, "model_latency.json")
+
+    @property
+    def report_file(self) -> str:
+        return self.run_report_file or os.path.join(os.path.dirname(self.output_file), "run_report.json")
+
+    @property
+    def generation_params(self) -> Dict:
+        return {"temperature": self.temperature, "top_p": self.top_p, "top_k": self.top_k, "max_tokens": self.max_tokens}
+
+
+def load_sources(path: str) -> List[Dict]:
+    """读取 source.json；文件缺失或格式错误时抛出 FileNotFoundError / json.JSONDecodeError"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ========== Utility Functions ==========
+def is_valid_content_link(link):
+    """Check if the link points to actual content rather than platform homepages."""
+    if not link:
+        return False
+
+    # Filter out generic platform links that don't point to specific content
+    for pattern in INVALID_LINK_PATTERNS:
+        if pattern.match(link):
+            return False
+
+    return True
+
+
+def clean_text_lines(text):
+    """清洗文本行，移除噪音内容"""
+    if not text:
+        return ""
+
+    lines = text.split('\n')
+    cleaned_lines = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # 检查是否包含噪音关键词且长度过短
+        line_lower = line.lower()
+        has_noise = any(keyword in line_lower for keyword in NOISE_KEYWORDS)
+        is_short = len(line) < MIN_LINE_LENGTH
+
+        # 丢弃含有噪音关键词且长度过短的行
+        if has_noise and is_short:
+            continue
+
+        cleaned_lines.append(line)
+
+    return '\n'.join(cleaned_lines)
+
+
+def truncate_head_tail(text, budget):
+    """按 token 预算做字符级截断：保留开头75%+结尾25%"""
+    head_tokens = int(budget * 0.75)
+    tail_tokens = budget - head_tokens - 20  # 预留省略标记空间
+    if tail_tokens > 0:
+        return (truncate_to_tokens(text, head_tokens) + '\n\n[... 内容已截断 ...]\n\n'
+                + truncate_to_tokens(text, tail_tokens, from_end=True))
+    return truncate_to_tokens(text, budget)
+
+
+def optimize_content_length(text, budget):
+    """内容长度优化：超出正文 token 预算时采用头75%+尾25%拼接策略"""
+    if not text:
+        return text
+
+    # 如果文本在 token 预算内，直接返回
+    if estimate_tokens(text) <= budget:
+        return text
+
+    # 文本过长，采用头75%+尾25%的切片策略
+    # 先按段落分割，保持段落完整性
+    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+
+    if not paragraphs:
+        # 如果没有段落分割，按行分割
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        if not lines:
+            return truncate_to_tokens(text, budget)
+
+        total_lines = len(lines)
+        head_lines = int(total_lines * 0.75)
+        tail_lines = total_lines - head_lines
+
+        head_content = '\n'.join(lines[:head_lines])
+        tail_content = '\n'.join(lines[-tail_lines:]) if tail_lines > 0 else ''
+
+        combined = head_content
+        if tail_content:
+            combined += '\n\n[... 中间内容已省略 ...]\n\n' + tail_content
+
+        # 如果合并后仍然过长，进行字符级截断
+        if estimate_tokens(combined) > budget:
+            combined = truncate_head_tail(text, budget)
+
+        return combined
+
+    # 按段落处理
+    total_paragraphs = len(paragraphs)
+    head_paragraphs = int(total_paragraphs * 0.75)
+    tail_paragraphs = total_paragraphs - head_paragraphs
+
+    head_content = '\n\n'.join(paragraphs[:head_paragraphs])
+    tail_content = '\n\n'.join(paragraphs[-tail_paragraphs:]) if tail_paragraphs > 0 else ''
+
+    combined = head_content
+    if tail_content:
+        combined += '\n\n[... 中间段落已省略 ...]\n\n' + tail_content
+
+    # 如果合并后仍然过长，进行字符级截断
+    if estimate_tokens(combined) > budget:
+        combined = truncate_head_tail(text, budget)
+
+    return combined
+
+
+def build_openrouter_payload(model, title, full_content, generation_params):
+    """Build the chat/completions payload (prompt + generation parameters) for one article."""
+    # Updated prompt for smart tagging system
+    prompt_content = f"""
+# TASK: Intelligent Content Analysis & Value-Based Tagging
+
+You are an expert content analyst specializing in extracting meaningful insights and generating intelligent tags based on content value and user discoverability.
+
+## ANALYSIS FRAMEWORK:
+
+### 1. CONTENT VALUE IDENTIFICATION
+- Assess information novelty and uniqueness
+- Evaluate practical applicability and actionability
+- Identify thought leadership and expert insights
+- Determine educational and learning value
+
+### 2. USER INTENT PREDICTION
+- Consider what users would search for to find this content
+- Identify the primary problems this content solves
+- Determine the target audience and their needs
+- Predict discovery patterns and search behaviors
+
+### 3. THREE-LAYER TAG GENERATION
+- Layer 1 (Value Type): Identify user reading intent (learn/solve/inspire/update/analyze/guide)
+- Layer 2 (Domain Theme): Determine content domain and thematic focus
+- Layer 3 (Feature Tags): Add 1-3 descriptive characteristics (actionable, advanced, etc.)
+- Ensure hierarchical consistency and user discoverability across all layers
+
+## TAG STRATEGY:
+
+**Layer 1 - Value Types (用户意图):** learn, solve, inspire, update, analyze, guide
+**Layer 2 - Domain Themes (领域主题):** ai-research, ai-product, startup-strategy, startup-funding, tech-trends, programming, cybersecurity, business-model, marketing, leadership, science, medicine, psychology, politics, economics, society, lifestyle, education, design
+**Layer 3 - Feature Tags (内容特征):** actionable, beginner-friendly, advanced, controversial, data-driven, future-focused, problem-solving, case-study, tutorial, expert-insight
+
+## OUTPUT SPECIFICATION:
+
+Return a JSON object with exactly these fields:
+
+```json
+{{
+  "title_zh": "Chinese translation of title (keep original if already Chinese)",
+  "summary_en": "150-200 word English analysis focusing on core insights, implications, and critical evaluation. Write with intellectual curiosity and personal engagement.",
+  "summary_zh": "150-200 character Chinese analysis that reads like thoughtful commentary, not mere summary. Include personal reflection and broader significance.",
+  "best_quote_en": "Most insightful English quote from article (translate if originally Chinese)",
+  "best_quote_zh": "Most insightful Chinese quote from article (translate if originally English)",
+  "tags": ["value-based", "discoverable", "English", "tags"],
+  "tags_zh": ["基于价值", "可发现的", "中文", "标签"]
+}}
+```
+
+## TAGGING QUALITY STANDARDS:
+
+**DO:**
+- Apply the three-layer tag hierarchy: Value Type + Domain Theme + Feature Tags
+- Layer 1: Identify user intent (learn/solve/inspire/update/analyze/guide)
+- Layer 2: Determine domain theme based on content focus
+- Layer 3: Add 1-3 feature tags that describe content characteristics
+- Ensure tags reflect actual content value and user discoverability
+- Generate 3-6 high-quality tags per language following the hierarchy
+
+**AVOID:**
+- Mixing tags from different layers without clear hierarchy
+- Generic topic tags without value context
+- Overly specific tags that limit discoverability
+- Redundant tags within the same layer
+- More than 6 tags per language or ignoring the three-layer structure
+
+## INPUT:
+
+**Title:** {title}
+
+**Content:**
+{full_content}
+
+---
+
+Provide your analysis as a clean JSON object only.""".strip()
+
+    # APE-optimized system prompt for better instruction following
+    system_prompt = """
+You are a world-class content analyst with expertise in:
+- Deep textual analysis and critical thinking
+- Cross-cultural communication and translation
+- Insight extraction and synthesis
+- Structured data output
+
+Core competencies:
+1. ANALYTICAL PRECISION: Extract meaningful insights beyond surface content
+2. LINGUISTIC EXCELLENCE: Provide nuanced translations and culturally appropriate summaries
+3. FORMAT COMPLIANCE: Generate clean, valid JSON without extraneous text
+4. INTELLECTUAL ENGAGEMENT: Write with genuine curiosity and thoughtful perspective
+
+Output requirements:
+- Return ONLY valid JSON objects
+- No code blocks, explanations, or additional text
+- Maintain strict language separation in tag arrays
+- Focus on insight over summary""".strip()
+
+    base_payload = {
+        "model": model,
+        **generation_params,
+        "messages": [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {"role": "user", "content": prompt_content}
+        ],
+    }
+
+    return base_payload
+
+
+def is_analysis_success(result):
+    return isinstance(result[0], dict)
+
+
+def analysis_error_class(raw_debug):
+    """Error class of a failed model call for the run report, e.g. 'HTTPError 429' or 'JSONDecodeError'."""
+    kind, _, detail = str(raw_debug).partition(':')
+    kind = kind.split('(')[0].strip()
+    if kind == 'HTTPError':
+        kind += ' ' + detail.split(';')[0].strip()
+    return kind or 'Unknown'
+
+
+class RSSPipeline:
+    """
+    一次运行的流水线状态与各阶段
+
+    共享资源在第一次使用时创建；run() 执行完整流程，各阶段方法也可以单独调用（基准测试、嵌入调度器）
+    """
+
+    def __init__(self, config: PipelineConfig, profiler: Optional['StageProfiler'] = None):
+        """
+        Args:
+            config: 流水线配置
+            profiler: 可选的已启动的 StageProfiler（剖析模式），run() 结束时停止并写出结果
+        """
+        self.config = config
+        self.profiler = profiler
+        self.metrics = RunMetrics(profiler=profiler)
+        self.new_items_count = 0
+        self.api_calls = 0
+        self.near_duplicates = []  # Candidates skipped as near-duplicates (reported in the summary)
+        self.presummarized = []    # (tokens before, tokens after) per pre-summarized article
+        self.candidates_by_source: Dict[str, List] = {}
+        self._counter = None
+
+    # ========== Lazily created resources ==========
+    @cached_property
+    def model_spec(self) -> ModelSpec:
+        """Model capabilities (context window / output limit) drive the token budget for article text."""
+        spec = get_model_spec(self.config.model)
+        if self.config.context_tokens:
+            spec = ModelSpec(self.config.model, self.config.context_tokens, spec.max_output_tokens)
+        return spec
+
+    @cached_property
+    def max_tokens(self) -> int:
+        """OPENROUTER_MAX_TOKENS clamped to the model's output limit (the config itself is left as given)."""
+        limit = self.model_spec.max_output_tokens
+        if self.config.max_tokens > limit:
+            print(f"WARNING: OPENROUTER_MAX_TOKENS={self.config.max_tokens} exceeds the model's output limit, "
+                  f"using {limit}.")
+            return limit
+        return self.config.max_tokens
+
+    @property
+    def generation_params(self) -> Dict:
+        """Generation parameters with max_tokens clamped to the model's output limit."""
+        return dict(self.config.generation_params, max_tokens=self.max_tokens)
+
+    @cached_property
+    def prompt_template_tokens(self) -> int:
+        return sum(
+            estimate_tokens(message['content'])
+            for message in build_openrouter_payload(self.config.model, '', '', self.generation_params)['messages']
+        ) + TITLE_TOKEN_ALLOWANCE
+
+    @cached_property
+    def content_token_budget(self) -> int:
+        """Token budget for article text: context window minus the prompt template (plus room for the title) and max_tokens."""
+        spec = self.model_spec
+        return content_token_budget(spec, self.prompt_template_tokens, self.max_tokens,
+                                    cap=self.config.max_content_tokens)
+
+    @cached_property
+    def html_parser(self) -> str:
+        from content_extractor import resolve_parser
+        return resolve_parser(self.config.html_parser)
+
+    @cached_property
+    def processed_links(self):
+        """Processed links (hash-indexed store; only new links are appended at the end of the run)."""
+        from link_store import LinkStore
+        config = self.config
+        store = LinkStore(config.processed_links_file, legacy_json_path=config.legacy_processed_links_file)
+        if store.migrated:
+            print(f"Migrated {store.migrated} links from {config.legacy_processed_links_file} to {config.processed_links_file}.")
+        print(f"Loaded {len(store)} processed links.")
+        return store
+
+    @cached_property
+    def output_writer(self):
+        """The published records, loaded once (used for the next ID and for the final write)."""
+        from output_writer import OutputWriter
+        writer = OutputWriter(self.config.output_file, max_items=self.config.max_output_items)
+        writer.load()
+        return writer
+
+    @cached_property
+    def archive(self):
+        from archive_writer import ShardedArchive
+        return ShardedArchive(self.config.archive_dir, shard_size=self.config.archive_shard_size)
+
+    @property
+    def counter(self) -> int:
+        """Next record id."""
+        if self._counter is None:
+            self._counter = max(self.output_writer.next_id(), self.archive.next_id())
+        return self._counter
+
+    @cached_property
+    def http_client(self):
+        from http_client import DEFAULT_USER_AGENT, HttpClient
+        config = self.config
+        return HttpClient(
+            pool_connections=config.http_pool_connections,
+            pool_maxsize=max(config.http_pool_maxsize, config.feed_workers, self.openrouter_max_in_flight),
+            connect_timeout=config.http_connect_timeout,
+            read_timeout=config.http_timeout,
+            user_agent=config.http_user_agent or DEFAULT_USER_AGENT,
+        )
+
+    @cached_property
+    def article_fetcher(self):
+        from article_fetcher import ArticleFetcher
+        return ArticleFetcher(self.http_client, max_bytes=self.config.article_max_bytes)
+
+    @cached_property
+    def model_chain(self):
+        from model_router import parse_model_chain
+        return parse_model_chain(self.config.model, self.config.fallback_models, self.config.model_timeout)
+
+    @property
+    def openrouter_max_in_flight(self) -> int:
+        """Articles in flight are capped at openrouter_max_concurrency; each may add hedge/fallback requests."""
+        return self.config.openrouter_max_concurrency * len(self.model_chain)
+
+    @cached_property
+    def openrouter_client(self):
+        from openrouter_client import AsyncOpenRouterClient
+        config = self.config
+        return AsyncOpenRouterClient(
+            self.http_client,
+            api_key=config.api_key,
+            url=config.openrouter_url,
+            max_concurrency=self.openrouter_max_in_flight,
+            requests_per_minute=config.openrouter_rpm,
+            tokens_per_minute=config.openrouter_tpm,
+            stream=config.stream,
+            first_token_timeout=config.first_token_timeout,
+            stream_idle_timeout=config.stream_idle_timeout,
+        )
+
+    @cached_property
+    def model_router(self):
+        from model_router import LatencyHistory, ModelRouter
+        return ModelRouter(
+            self.model_chain,
+            LatencyHistory(self.config.latency_file),
+            hedge_quantile=self.config.hedge_quantile,
+            hedge_min_samples=self.config.hedge_min_samples,
+        )
+
+    @cached_property
+    def analysis_cache(self):
+        if not self.config.analysis_cache_enabled:
+            return None
+        from analysis_cache import AnalysisCache
+        return AnalysisCache(
+            self.config.analysis_cache_file,
+            max_bytes=int(self.config.analysis_cache_max_mb * 1024 * 1024),
+            prompt_version=PROMPT_VERSION,
+            generation_params=self.generation_params,
+        )
+
+    @cached_property
+    def content_cache(self):
+        if not self.config.content_cache_enabled:
+            return None
+        from content_cache import ContentCache
+        from content_extractor import EXTRACTOR_VERSION
+        return ContentCache(
+            self.config.content_cache_file,
+            max_bytes=int(self.config.content_cache_max_mb * 1024 * 1024),
+            ttl=self.config.content_cache_ttl_hours * 3600,
+            extractor_version=EXTRACTOR_VERSION,
+            parser=self.html_parser,
+        )
+
+    @cached_property
+    def fingerprint_index(self):
+        if not self.config.near_dup_enabled:
+            return None
+        from near_duplicate import FingerprintIndex
+        return FingerprintIndex(
+            self.config.fingerprint_file,
+            max_distance=self.config.near_dup_max_distance,
+            window_days=self.config.near_dup_window_days,
+        )
+
+    @cached_property
+    def feed_collector(self):
+        from feed_cache import FeedStateCache
+        from feed_collector import FeedCollector
+        config = self.config
+        return FeedCollector(
+            workers=config.feed_workers,
+            connect_timeout=config.feed_connect_timeout,
+            read_timeout=config.feed_read_timeout,
+            deadline=config.feed_deadline,
+            state_cache=FeedStateCache(config.feed_state_file) if config.feed_conditional_get else None,
+            http_client=self.http_client,
+            metrics=self.metrics,
+        )
+
+    @cached_property
+    def source_scheduler(self):
+        if not self.config.source_scheduler_enabled:
+            return None
+        from source_scheduler import SourceScheduler
+        return SourceScheduler(self.config.source_stats_file, min_share=self.config.source_min_share,
+                               decay=self.config.source_stats_decay)
+
+    @cached_property
+    def tag_optimizer(self):
+        from tag_optimizer import TagOptimizer
+        return TagOptimizer()
+
+    def describe(self):
+        """Debug output for model configuration."""
+        config = self.config
+        spec = self.model_spec
+        print(f"Using model: {config.model}")
+        print(f"Model limits: {spec.context_tokens:,} context tokens, {spec.max_output_tokens:,} output tokens"
+              + ("" if spec.name != "default" else " (not in registry, conservative default)"))
+        print(f"HTML parser: {self.html_parser}")
+        print(f"Model parameters: temperature={config.temperature}, top_p={config.top_p}, "
+              f"top_k={config.top_k}, max_tokens={self.max_tokens}")
+        print(f"Content token budget: {self.content_token_budget:,} (prompt template ~{self.prompt_template_tokens:,}, "
+              f"output {self.max_tokens:,})")
+        if len(self.model_chain) > 1:
+            hedging = (f"hedge past p{config.hedge_quantile * 100:g} of learned latency" if config.hedge_quantile > 0
+                       else "no hedging")
+            print("Model chain: " + " -> ".join(f"{route.name} ({route.timeout:g}s)" for route in self.model_chain)
+                  + f"; {hedging}")
+
+    # ========== Stage 1: Collect candidates by source buckets ==========
+    def collect(self, sources: List[Dict]) -> Dict[str, List]:
+        """Collect stage: fetch all feeds concurrently and bucket unprocessed entries by source."""
+        with self.metrics.timer('collect'):
+            self.candidates_by_source = self.feed_collector.collect(
+                sources, self.processed_links, self.config.max_per_source
+            )  # { source_name: [entry, entry, ...] }
+        self._boundary('collect')
+
+        candidates_info = ', '.join([f'{k}:{len(v)}' for k, v in self.candidates_by_source.items()])
+        print(f"Available sources: {len(self.candidates_by_source)}; Candidates per source: {{{candidates_info}}}")
+        return self.candidates_by_source
+
+    # ========== Extract stage ==========
+    @property
+    def clean_signature(self) -> str:
+        """Everything that shapes the output of clean(); cached cleaned text is reused only when it matches."""
+        config = self.config
+        presummarize = config.presummarize_tokens if config.presummarize_enabled else 0
+        return f"{CLEAN_VERSION}:{self.content_token_budget}:{presummarize}"
+
+    def clean(self, text, source=None):
+        """Clean stage: drop noise lines and fit the text into the token budget."""
+        with self.metrics.timer('clean', source):
+            text = clean_text_lines(text)
+            budget = self.content_token_budget
+            # 可选：本地抽取式预摘要，从全文选句压缩到 presummarize_tokens，替代头尾切片
+            if self.config.presummarize_enabled and text:
+                from extractive_summarizer import summarize
+                original_tokens = estimate_tokens(text)
+                summary_budget = min(self.config.presummarize_tokens, budget)
+                if original_tokens > summary_budget:
+                    summary = summarize(text, summary_budget)
+                    self.presummarized.append((original_tokens, estimate_tokens(summary)))
+                    return summary
+            return optimize_content_length(text, budget)
+
+    def extract_full_content(self, link, rss_content_html, source=None):
+        """Extract webpage content; if RSS already contains long content, use it directly; otherwise scrape webpage and extract content."""
+        from content_extractor import CONTENT_SELECTORS, extract_article_text
+
+        # First try RSS content (some sources have complete content)
+        content_from_rss = ""
+        if isinstance(rss_content_html, list) and rss_content_html:
+            content_from_rss = rss_content_html[0].get('value', '') or ''
+        elif isinstance(rss_content_html, str):
+            content_from_rss = rss_content_html
+
+        if len(content_from_rss) > 1000:
+            return self.clean(content_from_rss, source), "Content fully retrieved from RSS Feed."
+
+        # RSS content is short: use the cached page if this URL was fetched recently, otherwise scrape it
+        cached = self.content_cache.get(link) if self.content_cache is not None else None
+        if cached is not None:
+            text = cached['text']
+            if text is None:
+                return (self.clean(content_from_rss, source),
+                        "Warning: Cached page has no main content, will use RSS summary.")
+            if cached['clean_sig'] != self.clean_signature:
+                # Cleaning settings changed since the page was cached: re-clean the stored text, no download/parse
+                cleaned = self.clean(text, source)
+                self.content_cache.set(link, cached['html'], text, cleaned, self.clean_signature,
+                                       fetched_at=cached['fetched_at'])
+                return cleaned, "Content extraction successful (cached page, re-cleaned)!"
+            return cached['cleaned'], "Content extraction successful (cached page)!"
+
+        try:
+            with self.metrics.timer('fetch', source):
+                html = self.article_fetcher.fetch(link)
+        except Exception as e:
+            return (self.clean(content_from_rss, source),
+                    f"RSS content is summary, webpage scraping failed: {e}, fallback to RSS summary.")
+
+        with self.metrics.timer('parse', source):
+            text = extract_article_text(html, CONTENT_SELECTORS, self.html_parser)
+
+        if text is not None:
+            cleaned, msg = self.clean(text, source), "Content extraction successful!"
+        else:
+            self.metrics.error('parse', 'NoMainContent', source)
+            cleaned, msg = self.clean(content_from_rss, source), "Warning: Failed to extract main content, will use RSS summary."
+        if self.content_cache is not None:
+            self.content_cache.set(link, html, text, cleaned if text is not None else '', self.clean_signature)
+        return cleaned, msg
+
+    def extract(self, source_name, entry):
+        """Fetch/extract stage: validate link, compute date and extract content for one candidate."""
+        title = entry.get('title', 'No Title')
+        link = entry.get('link', '')
+        prepared = {'title': title, 'link': link, 'full_content': None, 'extract_msg': ''}
+        if not link or not is_valid_content_link(link):
+            return prepared
+
+        # Date
+        published_parsed = entry.get('published_parsed')
+        if published_parsed:
+            dt_object = datetime.fromtimestamp(time.mktime(published_parsed))
+            prepared['date_str'] = dt_object.strftime('%Y-%m-%d')
+        else:
+            prepared['date_str'] = datetime.now().strftime('%Y-%m-%d')
+
+        # Skip extraction for links already known at startup (re-checked in order by the consumer)
+        if link in self.processed_links:
+            return prepared
+
+        # Timing and sizes are kept on the candidate and charged to the source by _record_extract() once the
+        # consumer takes it, so lookahead that the run never reaches does not skew the per-source statistics
+        started = time.perf_counter()
+        try:
+            with self.metrics.profile('extract'):
+                prepared['full_content'], prepared['extract_msg'] = self.extract_full_content(
+                    link, entry.get('content', [{'value': ''}]), source_name
+                )
+                prepared['fetch'] = self.article_fetcher.last_record(link)
+                if self.fingerprint_index is not None:
+                    from near_duplicate import simhash
+                    prepared['fingerprint'] = simhash(prepared['full_content'])
+        except Exception as e:
+            prepared['error'] = e
+        prepared['extract_s'] = time.perf_counter() - started
+        return prepared
+
+    def _record_extract(self, source_name, prepared):
+        """Charge a consumed candidate's extraction time, content size and errors to its source."""
+        if 'extract_s' not in prepared:
+            return  # Nothing was extracted (invalid link or already processed at startup)
+        self.metrics.observe('extract', prepared['extract_s'], source_name)
+        if prepared.get('error') is not None:
+            self.metrics.error('extract', type(prepared['error']).__name__, source_name)
+            return
+        self.metrics.count('content_chars', len(prepared['full_content']), source_name)
+        if prepared.get('fetch'):
+            self.metrics.count('article_bytes', prepared['fetch']['bytes'], source_name)
+
+    # ========== Analyze stage ==========
+    def _take_turn(self, source_name):
+        """A candidate consumed by the analysis stage: one turn for its source."""
+        self.metrics.count('considered', 1, source_name)
+        if self.source_scheduler is not None:
+            self.source_scheduler.take(source_name)
+
+    def _spend_call(self, source=None) -> bool:
+        """Budget check for a hedge/fallback request (the primary call is counted when it is launched)."""
+        if self.api_calls >= self.config.max_api_calls:
+            return False
+        self.api_calls += 1
+        self.metrics.count('api_calls', 1, source)
+        return True
+
+    async def analyze(self, title, full_content, source=None):
+        """
+        One article through the model chain, timed from launch to the winning response (includes waiting on the rate limiter).
+
+        Returns (analysis_data, raw_content, model).
+        """
+        # Only the synchronous request building is profiled (once per model call): a profiler held across
+        # awaits would also cover the other coroutines and, on Python 3.12+, lock out the extract and tag threads
+        def call(model, timing):
+            with self.metrics.profile('analyze'):
+                payload = build_openrouter_payload(model, title, full_content, self.generation_params)
+            return self.openrouter_client.analyze(payload, timing)
+
+        started = time.perf_counter()
+        try:
+            result = await self.model_router.analyze(call, spend=lambda: self._spend_call(source))
+        except Exception as e:
+            self.metrics.error('analyze', type(e).__name__, source)
+            raise
+        finally:
+            self.metrics.observe('analyze', time.perf_counter() - started, source)
+        if not is_analysis_success(result):
+            self.metrics.error('analyze', analysis_error_class(result[1]) if result[0] is None else 'InvalidFormat', source)
+        return result
+
+    def analyze_sync(self, title, full_content):
+        """Synchronous helper: analyze a single article outside the Stage 2 event loop."""
+        return asyncio.run(self.analyze(title, full_content))
+
+    # ========== Tag stage ==========
+    def tag(self, final_item, analysis_data, full_content):
+        """Tag stage: optimize tags for an analyzed item and fill them into the final record."""
+        with self.metrics.timer('tag', final_item['source']):
+            try:
+                # Get LLM tags as candidates
+                llm_tags_en = analysis_data.get('tags', [])
+                llm_tags_zh = analysis_data.get('tags_zh', [])
+
+                # Optimize tags using multi-stage process
+                tags_en, tags_zh = self.tag_optimizer.optimize_tags(
+                    llm_tags_en=llm_tags_en,
+                    llm_tags_zh=llm_tags_zh,
+                    title=final_item['title'],
+                    content=full_content,
+                    url=final_item['link'],
+                    source_name=final_item['source']
+                )
+
+                print(f"Tag optimization: {len(llm_tags_en + llm_tags_zh)} candidates -> {len(tags_en + tags_zh)} final tags")
+
+            except Exception as e:
+                print(f"Tag optimization failed, using LLM tags directly: {e}")
+                self.metrics.error('tag', type(e).__name__, final_item['source'])
+                # Fallback to original LLM tags with safe access
+                tags_en = analysis_data.get('tags', [])
+                tags_zh = analysis_data.get('tags_zh', [])
+
+            final_item['tags'] = tags_en
+            final_item['tags_zh'] = tags_zh
+            return final_item
+
+    # ========== Stage 2: Weighted turns across sources (every source keeps a minimum share) ==========
+    # Pipeline: fetch+extract (prefetch pool) -> analyze (asyncio, bounded concurrency) -> tag (background worker).
+    # The source order only depends on the buckets and the statistics from previous runs, so upcoming
+    # candidates can be fetched while the current one waits on the model; budgets are still checked strictly in order.
+    def process(self, candidates_by_source: Dict[str, List]) -> List[Dict]:
+        """Run extract -> analyze -> tag over the candidates; returns the new records in id order."""
+        from pipeline import Prefetcher, StageWorker, round_robin
+
+        # Create shared resources before the worker threads race to do it
+        for name in ('processed_links', 'article_fetcher', 'html_parser', 'content_token_budget',
+                     'fingerprint_index', 'analysis_cache', 'content_cache', 'counter'):
+            getattr(self, name)
+
+        if self.source_scheduler is not None:
+            shares = self.source_scheduler.plan([name for name, bucket in candidates_by_source.items() if bucket])
+            order = self.source_scheduler.order(candidates_by_source, shares)
+            print("Source shares: " + ", ".join(f"{name} {share:.0%}" for name, share in
+                                                 sorted(shares.items(), key=lambda kv: -kv[1])))
+        else:
+            order = round_robin(candidates_by_source)
+        prefetcher = Prefetcher(order, self.extract,
+                                workers=self.config.pipeline_workers, depth=self.config.pipeline_depth)
+        # Tag output is printed from this thread as items retire, so it never splits the progress lines
+        tag_stage = StageWorker(self.tag, maxsize=self.config.pipeline_depth, name='tag', capture_output=True)
+        try:
+            asyncio.run(self._run_analysis_stage(prefetcher, tag_stage))
+        finally:
+            prefetcher.close()
+        newly_processed_items = tag_stage.join()
+        self._boundary('pipeline')
+        return newly_processed_items
+
+    def _retire(self, tag_stage, source_name, title, link, date_str, full_content, from_cache, result):
+        """Handle one finished model call in candidate order: count it and hand successes to the tag stage."""
+        config = self.config
+        analysis_data, raw_debug, model = result
+        tag_stage.flush_output()
+
+        if analysis_data is None:
+            print(f"[Failed] Model call/parsing failed for '{title}': {raw_debug}")
+            print(f"[Progress] Success {self.new_items_count}/{config.max_new_items}, Calls {self.api_calls}/{config.max_api_calls}")
+            return
+
+        # Check if analysis_data is valid dictionary format
+        if not isinstance(analysis_data, dict):
+            print(f"[Failed] Invalid analysis_data format (expected dict, got {type(analysis_data).__name__}): {analysis_data}")
+            print(f"[Progress] Success {self.new_items_count}/{config.max_new_items}, Calls {self.api_calls}/{config.max_api_calls}")
+            return
+
+        if self.analysis_cache is not None and not from_cache:
+            # Keyed by the primary model; the model that answered is kept with the analysis
+            self.analysis_cache.set(config.model, title, full_content, dict(analysis_data, model=model))
+
+        # Assemble result; tags are filled in by the tag stage
+        final_item = {
+            "id": self.counter,
+            "title": title,
+            "title_zh": analysis_data.get('title_zh', ''),
+            "source": source_name,
+            "link": link,
+            "tags": [],
+            "tags_zh": [],
+            "date": date_str,
+            "model": model,
+            "summary_en": analysis_data.get('summary_en', ''),
+            "summary_zh": analysis_data.get('summary_zh', ''),
+            "best_quote_en": analysis_data.get('best_quote_en', ''),
+            "best_quote_zh": analysis_data.get('best_quote_zh', '')
+        }
+        tag_stage.submit(final_item, analysis_data, full_content)
+
+        self.processed_links.add(link)
+        self._counter += 1
+        self.new_items_count += 1
+        self.metrics.count('items', 1, source_name)
+        print(f"[Success] Generated {self.new_items_count}/{config.max_new_items} items; Total calls {self.api_calls}/{config.max_api_calls}")
+
+    async def _run_analysis_stage(self, prefetcher, tag_stage):
+        """
+        Analyze stage: keep up to openrouter_max_concurrency model calls in flight.
+
+        A new call is only started while `api_calls < max_api_calls` and the successes so far plus
+        the calls that may still succeed stay below max_new_items, so the run makes exactly the calls
+        the sequential loop would. Results are retired in candidate order, keeping ids deterministic.
+        """
+        from near_duplicate import hamming_distance
+
+        config = self.config
+        processed_links = self.processed_links
+        fingerprint_index = self.fingerprint_index
+        window = deque()  # [(context, task)] in candidate order
+        in_flight_links = set()
+        in_flight_fingerprints = {}  # link -> (fingerprint, title, source) of calls not yet retired
+        exhausted = False
+
+        def may_launch():
+            running = sum(1 for _, task in window if not task.done())
+            possible = sum(1 for _, task in window if not task.done() or is_analysis_success(task.result()))
+            return (not exhausted and self.api_calls < config.max_api_calls
+                    and self.new_items_count + possible < config.max_new_items
+                    and running < config.openrouter_max_concurrency)
+
+        while True:
+            while may_launch():
+                # StopIteration cannot cross a Future, so ask next() for a sentinel instead
+                prefetched = await asyncio.to_thread(next, prefetcher, None)
+                if prefetched is None:
+                    exhausted = True
+                    break
+                (source_name, latest_entry), prepared = prefetched
+
+                if isinstance(prepared, Exception):
+                    print(f"\n[Failed] Content extraction error for '{latest_entry.get('title', 'No Title')}': {prepared}")
+                    self._take_turn(source_name)
+                    continue
+
+                title = prepared['title']
+                link = prepared['link']
+                if not link or link in processed_links or link in in_flight_links or not is_valid_content_link(link):
+                    # Skip invalid links, already processed links, or generic platform links
+                    continue
+                self._take_turn(source_name)
+                self._record_extract(source_name, prepared)
+                if prepared.get('error') is not None:
+                    print(f"\n[Failed] Content extraction error for '{title}': {prepared['error']}")
+                    continue
+
+                print(f"\nProcessing entry (balanced mode): {title}")
+                print(f"Source: {source_name}")
+                print(f"Link: {link}")
+
+                full_content = prepared['full_content']
+                print(f"Content extraction: {prepared['extract_msg']}")
+                fetch_record = prepared.get('fetch')
+                if fetch_record and not fetch_record['rejected']:
+                    print(f"Downloaded: {fetch_record['bytes'] / 1024:.1f} KB"
+                          + (" (stopped at byte cap)" if fetch_record['truncated'] else ""))
+
+                # Skip if content is too short (don't consume model calls)
+                if len(full_content.strip()) < 200:
+                    print("Content too short, skipping this entry (no model call).")
+                    self.metrics.count('skipped_short', 1, source_name)
+                    continue
+
+                # Near-duplicate of an already published article or of one being analyzed right now
+                fingerprint = prepared.get('fingerprint')
+                if fingerprint is not None:
+                    duplicate = fingerprint_index.find(fingerprint, exclude_link=link)
+                    if duplicate is None:
+                        for other_link, (other_fp, other_title, other_source) in in_flight_fingerprints.items():
+                            distance = hamming_distance(fingerprint, other_fp)
+                            if distance <= config.near_dup_max_distance:
+                                duplicate = {'link': other_link, 'title': other_title, 'source': other_source,
+                                             'distance': distance, 'in_flight': True}
+                                break
+                    if duplicate is not None:
+                        print(f"[NearDuplicate] Skipping (no model call): matches '{duplicate['title']}' from "
+                              f"{duplicate['source']} (distance {duplicate['distance']}).")
+                        self.near_duplicates.append({'title': title, 'source': source_name, 'link': link,
+                                                     'duplicate_of': duplicate['link'], 'distance': duplicate['distance']})
+                        self.metrics.count('near_duplicates', 1, source_name)
+                        if not duplicate.get('in_flight'):
+                            # The original was published: never scrape this copy again
+                            processed_links.add(link)
+                        continue
+                    in_flight_fingerprints[link] = (fingerprint, title, source_name)
+
+                # Truncate if too long
+                budget = self.content_token_budget
+                content_tokens = estimate_tokens(full_content)
+                if content_tokens > budget:
+                    print(f"Content too long (~{content_tokens:,} tokens), truncating to {budget:,} tokens.")
+                    full_content = truncate_to_tokens(full_content, budget)
+
+                in_flight_links.add(link)
+                cached = self.analysis_cache.get(config.model, title, full_content) if self.analysis_cache is not None else None
+                if cached is not None:
+                    # Cache hit: reuse the previous analysis without spending an API call
+                    print("[AnalysisCache] Hit, reusing previous analysis (no model call).")
+                    self.metrics.count('cache_hits', 1, source_name)
+                    task = asyncio.get_running_loop().create_future()
+                    task.set_result((cached, "analysis cache hit", cached.get('model', config.model)))
+                else:
+                    # Call model (failures also count towards API calls)
+                    self.api_calls += 1
+                    self.metrics.count('api_calls', 1, source_name)
+                    task = asyncio.create_task(self.analyze(title, full_content, source_name))
+                window.append(((source_name, title, link, prepared['date_str'], full_content, cached is not None), task))
+
+            if not window:
+                break
+
+            pending = [task for _, task in window if not task.done()]
+            if pending:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            # Retire finished calls from the head of the window, in candidate order
+            while window and window[0][1].done():
+                context, task = window.popleft()
+                in_flight_links.discard(context[2])
+                fingerprint_meta = in_flight_fingerprints.pop(context[2], None)
+                self._retire(tag_stage, *context, task.result())
+                if fingerprint_meta is not None and context[2] in processed_links:
+                    fingerprint_index.add(fingerprint_meta[0], context[2], fingerprint_meta[1], fingerprint_meta[2])
+
+    # ========== Write Results ==========
+    def publish(self, newly_processed_items):
+        """
+        Write stage: archive shards, data.json, then the processed-links store and fingerprint index.
+
+        New records are appended and data.json is trimmed to the most recent max_output_items
+        in one validated, atomic write.
+        """
+        config = self.config
+        with self.metrics.timer('write'):
+            if newly_processed_items:
+                print(f"\nWriting {len(newly_processed_items)} new records to {config.archive_dir}/ and {config.output_file}...")
+                archive = self.archive
+                if not archive.exists and self.output_writer.items:
+                    # First sharded run: seed the archive with the records still in data.json
+                    archive.append(self.output_writer.items)
+                written_shards = archive.append(newly_processed_items)
+                print(f"Archive updated: {', '.join(written_shards)}; {archive.total} records in "
+                      f"{len(archive.manifest['shards'])} shards.")
+                written = self.output_writer.write(newly_processed_items)
+                print(f"Write completed: {config.output_file} now holds {len(written)} records (limit {config.max_output_items}).")
+            else:
+                print("\nNo new valid records this time, no write needed.")
+
+            # Append this run's links to the processed-links store
+            self.processed_links.save()
+            if self.fingerprint_index is not None:
+                self.fingerprint_index.save()
+            if 'model_router' in self.__dict__:
+                self.model_router.history.save()
+            if self.__dict__.get('source_scheduler') is not None:
+                self.source_scheduler.update(self.metrics.snapshot()['sources'])
+                self.source_scheduler.save()
+        self._boundary('write')
+
+    def report(self) -> Optional[Dict]:
+        """Print the run summary and write the run report next to the output file."""
+        config = self.config
+        cache_stats = None
+        if self.analysis_cache is not None:
+            cache_stats = self.analysis_cache.stats()
+            print(f"Analysis cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024:.0f} KB).")
+        content_cache = None
+        if self.__dict__.get('content_cache') is not None:
+            content_cache = self.content_cache.stats()
+            print(f"Content cache: {content_cache['hits']} hits, {content_cache['misses']} misses "
+                  f"({content_cache['expired']} expired), {content_cache['entries']} pages "
+                  f"({content_cache['bytes'] / 1024:.0f} KB compressed).")
+        if self.fingerprint_index is not None:
+            print(f"Near-duplicates skipped: {len(self.near_duplicates)} (index holds {len(self.fingerprint_index)} "
+                  f"fingerprints from the last {config.near_dup_window_days:g} days).")
+            for dup in self.near_duplicates:
+                print(f"  - [{dup['source']}] {dup['title']} -> {dup['duplicate_of']} (distance {dup['distance']})")
+        if config.presummarize_enabled:
+            before = sum(b for b, _ in self.presummarized)
+            after = sum(a for _, a in self.presummarized)
+            print(f"Pre-summarized {len(self.presummarized)} articles locally: ~{before:,} -> ~{after:,} tokens.")
+        fetch_stats = self.article_fetcher.stats
+        print(f"Articles: {fetch_stats['fetched']} downloaded ({fetch_stats['bytes'] / 1024:.0f} KB), "
+              f"{fetch_stats['truncated']} stopped at the {config.article_max_bytes // 1024} KB cap, "
+              f"{fetch_stats['rejected']} rejected as non-HTML.")
+        streaming = None
+        if config.stream and 'openrouter_client' in self.__dict__:
+            client = self.openrouter_client
+            streaming = dict(client.stream_stats, first_token=client.first_token_summary())
+            print(f"Streaming: {streaming['streams']} streams, {streaming['ended_early']} stopped after the object closed, "
+                  f"{streaming['aborted']} aborted early, {streaming['first_token_timeouts']} first-token timeouts.")
+            for model, ttft in streaming['first_token'].items():
+                print(f"  - {model}: time to first token p50 {ttft['p50_ms']:.0f} ms, p90 {ttft['p90_ms']:.0f} ms "
+                      f"({ttft['count']} calls)")
+        models = None
+        if 'model_router' in self.__dict__:
+            models = self.model_router.summary()
+            if len(self.model_chain) > 1:
+                print(f"Model chain: {models['hedges']} hedged, {models['hedge_wins']} won by the hedge, "
+                      f"{models['fallbacks']} fallbacks, {models['timeouts']} timeouts; answers per model: "
+                      + ", ".join(f"{model} {count}" for model, count in models['wins'].items()))
+        feed_stats = self.feed_collector.stats
+        print(f"Feeds: {feed_stats['fetched']} parsed, {feed_stats['unchanged']} unchanged (saved entries reused), "
+              f"{feed_stats['failed']} failed, {feed_stats['timed_out']} timed out.")
+
+        report_file = config.report_file
+        try:
+            run_report = self.metrics.write_json(
+                report_file,
+                model=config.model,
+                candidates=sum(len(v) for v in self.candidates_by_source.values()),
+                items=self.new_items_count,
+                api_calls=self.api_calls,
+                feeds=feed_stats,
+                articles=fetch_stats,
+                analysis_cache=cache_stats,
+                content_cache=content_cache,
+                streaming=streaming,
+                models=models,
+                scheduler=self.source_scheduler.report() if self.__dict__.get('source_scheduler') else None,
+            )
+            if config.run_report_prometheus:
+                self.metrics.write_prometheus(os.path.splitext(report_file)[0] + ".prom", run_report)
+            print(f"Run report: {report_file} (wall {run_report['wall_s']:.1f}s, peak RSS {run_report['peak_rss_mb']:.0f} MB).")
+            return run_report
+        except OSError as e:
+            print(f"Warning: failed to write run report {report_file}: {e}")
+            return None
+
+    def close(self):
+        """Release the resources that were actually created."""
+        for name in ('processed_links', 'analysis_cache', 'content_cache', 'http_client'):
+            resource = self.__dict__.get(name)
+            if resource is not None:
+                resource.close()
+
+    def _boundary(self, name: str):
+        if self.profiler is not None:
+            self.profiler.boundary(name)
+
+    def run(self, sources: Optional[List[Dict]] = None) -> int:
+        """
+        完整运行一次：collect → extract/analyze/tag → publish → report
+
+        Args:
+            sources: 订阅源列表；None 时读取 config.source_file
+
+        Returns:
+            int: 本次新增的条目数
+        """
+        config = self.config
+        self.describe()
+        try:
+            self.processed_links
+            print(f"Next new entry ID will start from {self.counter}.")
+            if sources is None:
+                try:
+                    sources = load_sources(config.source_file)
+                except (FileNotFoundError, json.JSONDecodeError) as e:
+                    print(f"WARNING: Failed to load source file {config.source_file}: {e}")
+                    print("No new valid records this time, no write needed.")
+                    print("\nAll processes completed: Successfully added 0 items; Model called 0 times.")
+                    return 0
+
+            candidates_by_source = self.collect(sources)
+            newly_processed_items = self.process(candidates_by_source)
+            self.publish(newly_processed_items)
+            self.report()
+        finally:
+            self.close()
+        if self.profiler is not None:
+            profile_summary = self.profiler.stop()
+            print(f"Profile written to {self.profiler.directory}/: " + ", ".join(
+                f"{name} {stats['profiled_calls']}/{stats['calls']} calls, {stats['samples']} samples"
+                for name, stats in profile_summary['stages'].items()))
+        print(f"\nAll processes completed: Successfully added {self.new_items_count} items; Model called {self.api_calls} "
+              f"times. Output file: {config.output_file}, Link cache: {config.processed_links_file}")
+        return self.new_items_count
+
+
+def run(config: Optional[PipelineConfig] = None, sources: Optional[List[Dict]] = None,
+        profiler: Optional['StageProfiler'] = None) -> int:
+    """用给定配置（默认读取环境变量）完整运行一次流水线，返回新增条目数"""
+    return RSSPipeline(config or PipelineConfig.from_env(), profiler=profiler).run(sources)
@@ -9,10 +9,12 @@
 import re
 import json
 import os
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Set
 from dataclasses import dataclass
 from urllib.parse import urlparse
 
+from multi_pattern import MultiPatternMatcher
+
 @dataclass
 class TagResult:
     """标签生成结果"""
@@ -31,6 +33,7 @@ class SmartTagGenerator:
         self.domain_themes = self._init_domain_themes()
         self.feature_tags = self._init_feature_tags()
         self.domain_patterns = self._init_domain_patterns()
+        self._compile_rules()
         
     def _init_value_types(self) -> Dict[str, Dict]:
         """初始化价值类型标签（第一层）"""
@@ -364,6 +367,39 @@ class SmartTagGenerator:
             'firstround.com': ['startup-strategy', 'leadership']
         }
     
+    def _compile_rules(self):
+        """将三层规则表预处理为小写关键词列表，并编译成一个多模式匹配自动机"""
+        self._value_indicators = {
+            value_type: [i.lower() for i in config['indicators']]
+            for value_type, config in self.value_types.items()
+        }
+        self._theme_keywords = {
+            theme: [k.lower() for k in config['keywords']]
+            for theme, config in self.domain_themes.items()
+        }
+        self._feature_indicators = {
+            feature: [i.lower() for i in config['indicators']]
+            for feature, config in self.feature_tags.items()
+        }
+        all_patterns = set()
+        for table in (self._value_indicators, self._theme_keywords, self._feature_indicators):
+            for patterns in table.values():
+                all_patterns.update(patterns)
+        self._matcher = MultiPatternMatcher(all_patterns)
+    
+    def _lookup_domain_patterns(self, url: str) -> Optional[List[str]]:
+        """域名后缀索引：依次尝试 a.b.example.com、b.example.com、example.com，子域名也能命中"""
+        domain = urlparse(url).netloc.lower().split(':')[0]
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        
+        labels = domain.split('.')
+        for i in range(len(labels) - 1):
+            suffix = '.'.join(labels[i:])
+            if suffix in self.domain_patterns:
+                return self.domain_patterns[suffix]
+        return None
+    
     def generate_tags(self, title: str, summary_en: str, summary_zh: str, 
                      url: str, source: str = "") -> TagResult:
         """生成智能标签"""
@@ -371,14 +407,18 @@ class SmartTagGenerator:
             # 合并所有文本内容用于分析
             content = f"{title} {summary_en} {summary_zh}".lower()
             
+            # 一次扫描得到全部命中的关键词，三层打分共用
+            matches = self._matcher.find(content)
+            title_matches = self._matcher.find(title.lower())
+            
             # 1. 识别价值类型（第一层，必选1个）
-            value_tag = self._identify_value_type(title, summary_en, summary_zh)
+            value_tag = self._identify_value_type(title, summary_en, summary_zh, matches, title_matches)
             
             # 2. 识别领域主题（第二层，1-2个）
-            domain_tags = self._identify_domain_themes(content, url, source)
+            domain_tags = self._identify_domain_themes(content, url, source, matches)
             
             # 3. 识别特征标签（第三层，0-1个）
-            feature_tag = self._identify_feature_tag(content)
+            feature_tag = self._identify_feature_tag(content, matches)
             
             # 4. 组合最终标签
             final_tags = [value_tag] + domain_tags
@@ -419,18 +459,23 @@ class SmartTagGenerator:
                 reasoning="Error occurred, using fallback tags"
             )
     
-    def _identify_value_type(self, title: str, summary_en: str, summary_zh: str) -> str:
+    def _identify_value_type(self, title: str, summary_en: str, summary_zh: str,
+                             matches: Optional[Set[str]] = None,
+                             title_matches: Optional[Set[str]] = None) -> str:
         """识别内容价值类型"""
-        content = f"{title} {summary_en} {summary_zh}".lower()
+        if matches is None:
+            matches = self._matcher.find(f"{title} {summary_en} {summary_zh}".lower())
+        if title_matches is None:
+            title_matches = self._matcher.find(title.lower())
         
         scores = {}
-        for value_type, config in self.value_types.items():
+        for value_type, indicators in self._value_indicators.items():
             score = 0
-            for indicator in config['indicators']:
+            for indicator in indicators:
                 # 标题中的指标权重更高
-                if indicator.lower() in title.lower():
+                if indicator in title_matches:
                     score += 3
-                elif indicator.lower() in content:
+                elif indicator in matches:
                     score += 1
             scores[value_type] = score
         
@@ -438,26 +483,26 @@ class SmartTagGenerator:
         best_type = max(scores.items(), key=lambda x: x[1])
         return best_type[0] if best_type[1] > 0 else 'update'  # 默认为update
     
-    def _identify_domain_themes(self, content: str, url: str, source: str) -> List[str]:
+    def _identify_domain_themes(self, content: str, url: str, source: str,
+                                matches: Optional[Set[str]] = None) -> List[str]:
         """识别领域主题（1-2个）"""
+        if matches is None:
+            matches = self._matcher.find(content)
         scores = {}
         
         # 基于域名的快速匹配
-        domain = urlparse(url).netloc.lower()
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        if domain in self.domain_patterns:
+        domain_themes = self._lookup_domain_patterns(url)
+        if domain_themes:
             # 域名匹配的主题获得高分
-            for theme in self.domain_patterns[domain]:
+            for theme in domain_themes:
                 if theme in self.domain_themes:
                     scores[theme] = scores.get(theme, 0) + 5
         
         # 基于关键词的匹配
-        for theme, config in self.domain_themes.items():
+        for theme, keywords in self._theme_keywords.items():
             score = 0
-            for keyword in config['keywords']:
-                if keyword.lower() in content:
+            for keyword in keywords:
+                if keyword in matches:
                     score += 1
             scores[theme] = scores.get(theme, 0) + score
         
@@ -474,14 +519,16 @@ class SmartTagGenerator:
         
         return result if result else ['general']
     
-    def _identify_feature_tag(self, content: str) -> Optional[str]:
+    def _identify_feature_tag(self, content: str, matches: Optional[Set[str]] = None) -> Optional[str]:
         """识别特征标签（0-1个）"""
+        if matches is None:
+            matches = self._matcher.find(content)
         scores = {}
         
-        for feature, config in self.feature_tags.items():
+        for feature, indicators in self._feature_indicators.items():
             score = 0
-            for indicator in config['indicators']:
-                if indicator.lower() in content:
+            for indicator in indicators:
+                if indicator in matches:
                     score += 1
             if score > 0:
                 scores[feature] = score
@@ -528,11 +575,7 @@ class SmartTagGenerator:
         confidence = 0.5  # 基础置信度
         
         # 域名匹配增加置信度
-        domain = urlparse(url).netloc.lower()
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        if domain in self.domain_patterns:
+        if self._lookup_domain_patterns(url) is not None:
             confidence += 0.2
         
         # 标签数量合理增加置信度
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按产出加权的来源调度 - 替代固定轮询
+
+设计说明：
+- 每个来源跨运行保存统计（衰减累计）：处理的候选数、产出条目数、模型调用数、模型失败数、
+  抽取耗时与正文长度；每次运行结束时从运行报告的按来源数据更新
+- 权重 = 预期产出（条目/候选）÷ 预期成本（每个候选的固定开销 + 模型调用数 + 抽取耗时折算
+  + 正文长度折算，正文越长 prompt token 越多）；产出和成本都带先验，没有历史的来源按先验估计，新来源不会被饿死
+- 模型失败率不单独计入权重：失败的候选不产出条目、重试和回退的调用计入调用数，已分别体现在产出和成本中，
+  再乘一次会重复惩罚；失败率只写入报告作为说明
+- 份额 = 保底份额（平均份额的 min_share 倍）+ 其余部分按权重分配；min_share=1 时各来源份额均等
+- 用平滑加权轮询（smooth weighted round-robin）产出顺序：顺序只取决于候选桶和运行开始时的统计，
+  因此仍可提前预取；份额相同时退化为依次轮流
+- 每个来源的份额及其依据写入运行报告
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Priors: a source without history is expected to yield 1 item per 2 candidates at 1 call per candidate
+PRIOR_CANDIDATES = 2.0
+PRIOR_ITEMS = 1.0
+PRIOR_CALLS = 2.0
+TURN_COST = 0.25               # Fixed cost of a turn (feed slot, prefetch, tagging) in call-equivalents
+EXTRACT_SECONDS_PER_CALL = 10  # Extraction seconds worth one model call
+CONTENT_CHARS_PER_CALL = 40000  # Article characters (prompt tokens) worth one extra model call
+STAT_FIELDS = ('candidates', 'items', 'api_calls', 'analyzed', 'llm_failures', 'extract_s', 'content_chars')
+
+
+class SourceScheduler:
+    """来源调度器：跨运行统计 + 平滑加权轮询"""
+
+    def __init__(self, path: str, min_share: float = 0.3, decay: float = 0.8):
+        """
+        Args:
+            path: 统计文件路径（JSON）
+            min_share: 每个来源的保底份额，相对平均份额（0 ~ 1；1 = 均分）
+            decay: 每次更新时旧统计乘以的衰减系数（越小越看重最近的运行）
+        """
+        self.path = path
+        self.min_share = min(1.0, max(0.0, min_share))
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._stats = self._load()
+        self.decisions: Dict[str, Dict] = {}
+        self.scheduled: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            sources = data.get('sources', {}) if isinstance(data, dict) else {}
+            return {name: stats for name, stats in sources.items() if isinstance(stats, dict)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def estimate(self, source: str) -> Dict[str, Any]:
+        """按历史统计（加先验）估计一个来源的产出、成本和权重"""
+        with self._lock:
+            stats = dict(self._stats.get(source, {}))
+        candidates = stats.get('candidates', 0.0)
+        items = stats.get('items', 0.0)
+        api_calls = stats.get('api_calls', 0.0)
+        expected_yield = (items + PRIOR_ITEMS) / (candidates + PRIOR_CANDIDATES)
+        calls_per_candidate = (api_calls + PRIOR_CALLS) / (candidates + PRIOR_CANDIDATES)
+        extract_s = stats.get('extract_s', 0.0) / candidates if candidates else 0.0
+        content_chars = stats.get('content_chars', 0.0) / candidates if candidates else 0.0
+        # Longer articles cost more prompt tokens on every call made for them
+        cost = (TURN_COST + calls_per_candidate * (1 + content_chars / CONTENT_CHARS_PER_CALL)
+                + extract_s / EXTRACT_SECONDS_PER_CALL)
+        analyzed = stats.get('analyzed', 0.0)
+        return {
+            'history_candidates': round(candidates, 2),
+            'expected_yield': expected_yield,
+            'calls_per_candidate': calls_per_candidate,
+            'avg_extract_s': extract_s,
+            'avg_content_chars': content_chars,
+            'llm_failure_rate': stats.get('llm_failures', 0.0) / analyzed if analyzed else 0.0,
+            'cost': cost,
+            'weight': expected_yield / cost,
+        }
+
+    def plan(self, sources: List[str]) -> Dict[str, float]:
+        """计算本次运行各来源的份额，并记录依据"""
+        if not sources:
+            return {}
+        estimates = {source: self.estimate(source) for source in sources}
+        total_weight = sum(e['weight'] for e in estimates.values())
+        floor = self.min_share / len(sources)
+        shares = {}
+        self.decisions = {}
+        for source, estimate in estimates.items():
+            weighted = (1 - self.min_share) * estimate['weight'] / total_weight
+            shares[source] = floor + weighted
+            if not estimate['history_candidates']:
+                basis = "no history, prior estimate"
+            else:
+                basis = (f"{estimate['history_candidates']:g} candidates of history, "
+                         f"LLM failure rate {estimate['llm_failure_rate']:.0%}")
+            reason = (f"expected {estimate['expected_yield']:.2f} items/candidate at "
+                      f"{estimate['cost']:.2f} call-equivalents ({estimate['calls_per_candidate']:.2f} calls, "
+                      f"{estimate['avg_content_chars']:,.0f} chars, {estimate['avg_extract_s']:.1f}s extraction) "
+                      f"-> share {shares[source]:.0%} ({basis})")
+            if floor >= weighted:
+                reason += "; mostly from the minimum share"
+            self.decisions[source] = dict(estimate, share=shares[source], reason=reason)
+        return shares
+
+    def order(self, candidates_by_source: Dict[str, List],
+              shares: Optional[Dict[str, float]] = None) -> Iterator[Tuple[str, Any]]:
+        """按份额（默认现算 plan()）用平滑加权轮询产出 (source_name, entry)；空桶出环"""
+        buckets = {name: list(bucket) for name, bucket in candidates_by_source.items() if bucket}
+        if shares is None:
+            shares = self.plan(list(buckets.keys()))
+        current = {name: 0.0 for name in buckets}
+        self.scheduled = {name: 0 for name in buckets}
+        while buckets:
+            total = 0.0
+            for name in buckets:
+                current[name] += shares[name]
+                total += shares[name]
+            # Ties go to the earliest source, so equal shares rotate through the sources in order
+            source_name = max(buckets, key=lambda name: current[name])
+            current[source_name] -= total
+            bucket = buckets[source_name]
+            entry = bucket.pop(0)
+            if not bucket:
+                del buckets[source_name]
+                del current[source_name]
+            yield source_name, entry
+
+    def take(self, source: str):
+        """记一次真正被处理的轮次（预取了但没用上的候选不计）"""
+        self.scheduled[source] = self.scheduled.get(source, 0) + 1
+
+    def update(self, run_sources: Dict[str, Dict]):
+        """用一次运行的按来源数据（RunMetrics.snapshot()['sources']）更新统计"""
+        now = int(time.time())
+        with self._lock:
+            for source, data in run_sources.items():
+                stages = data.get('stages', {})
+                counters = data.get('counters', {})
+                run = {
+                    'candidates': counters.get('considered', 0),
+                    'items': counters.get('items', 0),
+                    'api_calls': counters.get('api_calls', 0),
+                    'analyzed': stages.get('analyze', {}).get('count', 0),
+                    'llm_failures': sum(count for key, count in data.get('errors', {}).items()
+                                        if key.startswith('analyze:')),
+                    'extract_s': stages.get('extract', {}).get('total_s', 0.0),
+                    'content_chars': counters.get('content_chars', 0),
+                }
+                if not run['candidates']:
+                    continue  # Nothing new learned about this source
+                stats = self._stats.setdefault(source, {})
+                for field in STAT_FIELDS:
+                    stats[field] = round(stats.get(field, 0.0) * self.decay + run[field], 3)
+                stats['runs'] = stats.get('runs', 0) + 1
+                stats['updated_at'] = now
+
+    def save(self):
+        """原子写入：先写临时文件再替换"""
+        with self._lock:
+            data = json.dumps({'version': 1, 'sources': self._stats}, indent=2, ensure_ascii=False, sort_keys=True)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def report(self) -> Dict:
+        """运行报告中的调度说明"""
+        return {
+            'min_share': self.min_share,
+            'decay': self.decay,
+            'sources': {
+                source: dict(decision, scheduled=self.scheduled.get(source, 0))
+                for source, decision in self.decisions.items()
+            },
+        }
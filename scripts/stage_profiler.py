@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段性能剖析 - cProfile、调用栈采样与 tracemalloc 快照
+
+设计说明：
+- 每个阶段调用（feed、extract、fetch、parse、clean、tag、write 等）包一层 cProfile，
+  同一阶段的多次调用合并为一份统计，保存为 .pstats（可用 snakeviz 打开）和按累计耗时排序的文本表
+- 同一线程内嵌套的阶段只在最外层启用 cProfile（一个线程同时只能有一个 profiler）；
+  Python 3.12+ 的 cProfile 是进程级的，并发线程里的调用取不到 profiler 时跳过，只计入次数
+- 另起一个采样线程，定时读取所有线程的调用栈（墙钟采样，等待网络也会计入），
+  按该线程当前所处的（最内层）阶段归类，输出 collapsed stacks（flamegraph.pl / speedscope 可直接读取），覆盖预取与打标线程
+- 在阶段边界拍 tracemalloc 快照，输出按代码行汇总的内存占用前几名及与上一个快照的差异
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+TOP_ALLOCATION_DIFFS = 15
+MAX_STACK_DEPTH = 128
+# 剖析工具自身的分配不计入内存报告
+PROFILER_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StageProfiler:
+    """按阶段收集 CPU 与内存剖析数据，结束时写入 profile 目录"""
+
+    def __init__(self, directory: str, sample_interval: float = 0.005, tracemalloc_frames: int = 10):
+        """
+        Args:
+            directory: 输出目录
+            sample_interval: 调用栈采样间隔（秒），<= 0 关闭采样
+            tracemalloc_frames: 每次分配记录的栈深度，<= 0 关闭内存快照
+        """
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._calls: Counter = Counter()
+        self._profiled_calls: Counter = Counter()
+        self._thread_stages: Dict[int, List[str]] = {}
+        self._samples: Counter = Counter()
+        self._snapshots = []  # [(name, snapshot, current_bytes, peak_bytes)]
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        if self.sample_interval > 0:
+            self._sampler = threading.Thread(target=self._sample_loop, name='stage-profiler', daemon=True)
+            self._sampler.start()
+        self.boundary('start')
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        """剖析一次阶段调用；嵌套时 cProfile 只在最外层启用，采样按最内层阶段归类"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._calls[name] += 1
+            self._thread_stages.setdefault(thread_id, []).append(name)
+        profile = None
+        if not getattr(self._local, 'active', False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._local.active = True
+            except ValueError:
+                profile = None  # Another thread holds the process-wide profiler (Python 3.12+)
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._local.active = False
+                self._merge(name, profile)
+            with self._lock:
+                stack = self._thread_stages.get(thread_id)
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self._thread_stages.pop(thread_id, None)
+
+    def _merge(self, name: str, profile: cProfile.Profile):
+        # Merging into pstats is slow; keep the raw profiles and merge once in stop()
+        with self._lock:
+            self._profiled_calls[name] += 1
+            self._profiles.setdefault(name, []).append(profile)
+
+    def boundary(self, name: str):
+        """在阶段边界拍一次内存快照"""
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self._snapshots.append((name, tracemalloc.take_snapshot(), current, peak))
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        main_id = threading.main_thread().ident
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                stages = {tid: stack[-1] for tid, stack in self._thread_stages.items() if stack}
+            for thread_id, frame in frames.items():
+                # Idle pool threads are skipped: only threads inside a stage (and the main thread) count
+                if thread_id == own_id or (thread_id not in stages and thread_id != main_id):
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(stages.get(thread_id, 'other'))
+                self._samples[';'.join(reversed(labels))] += 1
+
+    def stop(self) -> Dict:
+        """停止采样并写出全部结果，返回摘要"""
+        self.boundary('end')
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        os.makedirs(self.directory, exist_ok=True)
+
+        for name, profiles in self._profiles.items():
+            stats = pstats.Stats(*profiles, stream=io.StringIO())
+            stats.dump_stats(os.path.join(self.directory, f"{name}.pstats"))
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            with open(os.path.join(self.directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                f.write(stream.getvalue())
+
+        if self._samples:
+            with open(os.path.join(self.directory, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        previous = None
+        for index, (name, snapshot, _, _) in enumerate(self._snapshots):
+            # Filtering is slow (pure Python per trace), so it happens here rather than at the boundary
+            snapshot = snapshot.filter_traces(PROFILER_FILTERS)
+            path = os.path.join(self.directory, f"alloc-{index:02d}-{name}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                self._write_allocations(f, name, snapshot, previous)
+            previous = (name, snapshot)
+
+        sample_counts = Counter()
+        for stack, count in self._samples.items():
+            sample_counts[stack.split(';', 1)[0]] += count
+        summary = {
+            'wall_s': time.perf_counter() - self._started if self._started else 0.0,
+            'sample_interval_s': self.sample_interval,
+            'stages': {
+                name: {
+                    'calls': self._calls[name],
+                    'profiled_calls': self._profiled_calls[name],
+                    'samples': sample_counts.get(name, 0),
+                }
+                for name in sorted(set(self._calls) | set(sample_counts))
+            },
+            'memory': [
+                {'boundary': name, 'traced_mb': current / 1024 / 1024, 'traced_peak_mb': peak / 1024 / 1024}
+                for name, _, current, peak in self._snapshots
+            ],
+        }
+        with open(os.path.join(self.directory, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    @staticmethod
+    def _write_allocations(f, name, snapshot, previous):
+        stats = snapshot.statistics('lineno')
+        total = sum(stat.size for stat in stats)
+        f.write(f"Boundary: {name}; traced {total / 1024 / 1024:.1f} MB in {len(stats)} lines\n\n")
+        f.write(f"Top {TOP_ALLOCATIONS} allocation sites:\n")
+        for stat in stats[:TOP_ALLOCATIONS]:
+            f.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback[0]}\n")
+        if previous is not None:
+            previous_name, previous_snapshot = previous
+            diffs = snapshot.compare_to(previous_snapshot, 'lineno')
+            f.write(f"\nTop {TOP_ALLOCATION_DIFFS} changes since '{previous_name}':\n")
+            for diff in diffs[:TOP_ALLOCATION_DIFFS]:
+                f.write(f"{diff.size_diff / 1024:+10.1f} KB {diff.count_diff:+8d} blocks  {diff.traceback[0]}\n")
@@ -5,6 +5,7 @@
 // 3. 数据源状态显示
 // 4. 自动刷新机制
 // 5. 改进的多语言支持
+// 6. 分片归档：先加载最新分片，更早的内容按需加载
 
 let raw = [], view = [], activeSources = new Set(['all']), activeTags = new Set(['all']);
 let searchEl, sortEl, refreshEl;
@@ -108,20 +109,19 @@ function analyzeDataSources() {
   window.dataSourceStatus = sources;
 }
 
-// 以"页面 URL"为基准解析 data.json；加入时间戳避免缓存；若拿到 HTML（如 404 页面）则报错
-async function loadData() {
-  // 构建data.json的URL，确保在GitHub Pages环境下正确工作
-  let dataUrl;
+// 以"页面 URL"为基准解析数据文件路径（GitHub Pages 与本地开发环境）
+function resolveDataUrl(path) {
   if (window.location.pathname.includes('/curated-gems/')) {
     // GitHub Pages环境
-    dataUrl = window.location.origin + '/curated-gems/data.json';
-  } else {
-    // 本地开发环境
-    dataUrl = new URL('data.json', window.location.href).toString();
+    return window.location.origin + '/curated-gems/' + path;
   }
-  
-  // 添加时间戳避免缓存
-  const url = new URL(dataUrl);
+  // 本地开发环境
+  return new URL(path, window.location.href).toString();
+}
+
+// 加入时间戳避免缓存；若拿到 HTML（如 404 页面）则报错
+async function fetchJson(path) {
+  const url = new URL(resolveDataUrl(path));
   url.searchParams.set('_', Date.now());
   const urlStr = url.toString();
 
@@ -140,21 +140,100 @@ async function loadData() {
 
   const text = await res.text();
   if (/^\s*<!doctype html>|^\s*<html/i.test(text)) {
-    throw new Error(`Got HTML instead of JSON from ${urlStr}. This might indicate the data.json file doesn't exist or GitHub Actions hasn't run yet.`);
+    throw new Error(`Got HTML instead of JSON from ${urlStr}. This might indicate the ${path} file doesn't exist or GitHub Actions hasn't run yet.`);
   }
-  
+
   try {
-    const data = JSON.parse(text);
-    if (!Array.isArray(data)) {
-      throw new Error('Data format error: expected an array');
-    }
-    return data;
+    return JSON.parse(text);
   } catch (e) {
     console.error('Raw response (first 200 chars):', text.slice(0, 200));
     throw new Error(`JSON parsing failed: ${e.message}`);
   }
 }
 
+// 分片归档：archive/manifest.json 列出全部分片（旧 → 新），先加载最新分片，旧分片按需加载
+const MIN_INITIAL_ITEMS = 30;
+window.archiveManifest = null;
+window.nextShardIndex = -1;  // 下一个待加载的旧分片下标；< 0 表示没有更多
+
+async function loadShard(index) {
+  const shard = window.archiveManifest.shards[index];
+  const items = await fetchJson('archive/' + shard.file);
+  if (!Array.isArray(items)) {
+    throw new Error(`Data format error: ${shard.file} is not an array`);
+  }
+  return items;
+}
+
+async function loadData() {
+  // 优先使用分片归档；没有清单时回退到 data.json（最近 100 条）
+  let manifest = null;
+  try {
+    manifest = await fetchJson('archive/manifest.json');
+  } catch (e) {
+    console.log('Archive manifest unavailable, falling back to data.json:', e.message);
+  }
+
+  if (manifest && Array.isArray(manifest.shards) && manifest.shards.length) {
+    window.archiveManifest = manifest;
+    let index = manifest.shards.length - 1;
+    let items = await loadShard(index);
+    // 最新分片刚开始写时条目很少，再补一个旧分片
+    while (items.length < MIN_INITIAL_ITEMS && index > 0) {
+      index -= 1;
+      items = (await loadShard(index)).concat(items);
+    }
+    window.nextShardIndex = index - 1;
+    return items;
+  }
+
+  window.archiveManifest = null;
+  window.nextShardIndex = -1;
+  const data = await fetchJson('data.json');
+  if (!Array.isArray(data)) {
+    throw new Error('Data format error: expected an array');
+  }
+  return data;
+}
+
+// 加载更早的分片并追加到当前数据
+async function loadOlder() {
+  if (window.nextShardIndex < 0) return;
+  const btn = $('#load-older');
+  try {
+    if (btn) btn.disabled = true;
+    const older = await loadShard(window.nextShardIndex);
+    window.nextShardIndex -= 1;
+    raw = older.concat(raw);
+    window.currentData = raw;
+    analyzeDataSources();
+    renderWithLanguage();
+  } catch (e) {
+    console.error('Loading older shard failed:', e);
+    showNotification((window.currentLang === 'en' ? 'Failed to load older items: ' : '加载更早内容失败: ') + e.message, 'error');
+  } finally {
+    if (btn) btn.disabled = false;
+  }
+}
+
+// 列表下方的"加载更早内容"按钮，没有更多分片时隐藏
+function renderLoadOlder() {
+  let btn = $('#load-older');
+  if (!btn) {
+    btn = document.createElement('button');
+    btn.id = 'load-older';
+    btn.className = 'refresh-btn';
+    btn.addEventListener('click', loadOlder);
+    $('#list').insertAdjacentElement('afterend', btn);
+  }
+  const lang = window.currentLang || 'zh';
+  const remaining = window.archiveManifest
+    ? window.archiveManifest.shards.slice(0, window.nextShardIndex + 1).reduce((n, s) => n + s.count, 0)
+    : 0;
+  btn.textContent = lang === 'zh' ? `加载更早内容（还有 ${remaining} 条）` : `Load older items (${remaining} more)`;
+  btn.classList.toggle('hidden', window.nextShardIndex < 0);
+}
+
 function mountControls() {
   const lang = window.currentLang || 'zh';
   const texts = {
@@ -266,7 +345,17 @@ async function handleRefresh() {
 // 检查更新
 async function checkForUpdates() {
   try {
-    const newData = await loadData();
+    if (window.archiveManifest) {
+      // 只比较清单：最新分片的哈希变化即有新内容
+      const manifest = await fetchJson('archive/manifest.json');
+      const latest = manifest.shards[manifest.shards.length - 1];
+      const known = window.archiveManifest.shards[window.archiveManifest.shards.length - 1];
+      if (!latest || !known || latest.sha256 !== known.sha256 || manifest.shards.length !== window.archiveManifest.shards.length) {
+        showNotification('发现新内容，点击刷新按钮更新', 'info');
+      }
+      return;
+    }
+    const newData = await fetchJson('data.json');
     if (JSON.stringify(newData) !== JSON.stringify(raw)) {
       showNotification('发现新内容，点击刷新按钮更新', 'info');
     }
@@ -413,6 +502,7 @@ function renderTags(list) {
 function render(items) {
   const listEl = $('#list'), emptyEl = $('#empty');
   const lang = window.currentLang || 'zh';
+  renderLoadOlder();
   
   if (!items.length) {
     listEl.innerHTML = '';